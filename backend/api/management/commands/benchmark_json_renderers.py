@@ -0,0 +1,52 @@
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from api.products.models import Product
+from api.products.serializers import ProductSerializer
+from api.products.tree import category_children_map
+from api.renderers import FastJSONRenderer, orjson
+from subscriptions.models import Subscription
+
+
+class Command(BaseCommand):
+    help = "Compare JSONRenderer with FastJSONRenderer on a page of ProductSerializer output."
+
+    def add_arguments(self, parser):
+        parser.add_argument('subscription', help="Subscription id")
+        parser.add_argument('--page-size', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        try:
+            subscription = Subscription.objects.get(pk=options['subscription'])
+        except (Subscription.DoesNotExist, ValidationError):
+            raise CommandError("Subscription not found.")
+
+        products = Product.objects.filter(subscription=subscription).select_related('category')
+        data = ProductSerializer(
+            products[:options['page_size']],
+            many=True,
+            context={'category_children': category_children_map(subscription)},
+        ).data
+        repeat = options['repeat']
+
+        def measure(renderer):
+            started = time.perf_counter()
+            for _ in range(repeat):
+                output = renderer.render(data)
+            return output, (time.perf_counter() - started) / repeat * 1000
+
+        expected, stdlib_ms = measure(JSONRenderer())
+        actual, fast_ms = measure(FastJSONRenderer())
+
+        self.stdout.write(f"{len(data)} product(s), {len(expected)} bytes, {repeat} run(s)")
+        self.stdout.write(f"JSONRenderer:     {stdlib_ms:.2f} ms")
+        self.stdout.write(
+            f"FastJSONRenderer: {fast_ms:.2f} ms ({'orjson' if orjson else 'stdlib fallback'})"
+        )
+        if actual != expected:
+            raise CommandError("Outputs differ.")
+        self.stdout.write(self.style.SUCCESS(f"Identical output, {stdlib_ms / fast_ms:.1f}x faster"))
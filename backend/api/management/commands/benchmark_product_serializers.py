@@ -0,0 +1,56 @@
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from api.products.fast_serializers import ProductFastSerializer
+from api.products.models import Product
+from api.products.serializers import ProductListSerializer
+from subscriptions.models import Subscription
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare ProductListSerializer with ProductFastSerializer on one page of "
+        "a subscription's products. Query time is measured separately."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('subscription', help="Subscription id")
+        parser.add_argument('--page-size', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            subscription = Subscription.objects.get(pk=options['subscription'])
+        except (Subscription.DoesNotExist, ValidationError):
+            raise CommandError("Subscription not found.")
+
+        queryset = Product.objects.filter(subscription=subscription).order_by('-created_at', '-pk')
+        queryset = queryset[:options['page_size']]
+        fast = ProductFastSerializer()
+        repeat = options['repeat']
+
+        def measure(load, serialize):
+            load_time = serialize_time = 0.0
+            for _ in range(repeat):
+                started = time.perf_counter()
+                rows = load()
+                loaded = time.perf_counter()
+                serialize(rows)
+                load_time += loaded - started
+                serialize_time += time.perf_counter() - loaded
+            return load_time / repeat * 1000, serialize_time / repeat * 1000
+
+        drf = measure(
+            lambda: list(queryset.select_related('category')),
+            lambda rows: ProductListSerializer(rows, many=True).data,
+        )
+        quick = measure(lambda: list(fast.rows(queryset)), fast.serialize)
+
+        rows = len(list(fast.rows(queryset)))
+        self.stdout.write(f"{rows} product(s), {repeat} run(s); times are per page")
+        self.stdout.write(f"ProductListSerializer: query {drf[0]:.2f} ms, serialize {drf[1]:.2f} ms")
+        self.stdout.write(f"ProductFastSerializer: query {quick[0]:.2f} ms, serialize {quick[1]:.2f} ms")
+        if quick[1]:
+            self.stdout.write(self.style.SUCCESS(f"Serialization speedup: {drf[1] / quick[1]:.1f}x"))
@@ -0,0 +1,46 @@
+import sys
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from api.products.export import EXPORT_FIELDS, export_rows
+from api.products.models import Product
+from api.renderers import CSVRenderer, NDJSONRenderer
+from subscriptions.models import Subscription
+
+
+class Command(BaseCommand):
+    help = "Export the products of a subscription as NDJSON or CSV, in flat memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('subscription', help="Subscription id")
+        parser.add_argument('path', nargs='?', default='-', help="Output file (default: stdout)")
+        parser.add_argument(
+            '--format',
+            choices=['ndjson', 'csv'],
+            help="Output format (default: guessed from the file extension, else ndjson)"
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            subscription = Subscription.objects.get(pk=options['subscription'])
+        except (Subscription.DoesNotExist, ValidationError):
+            raise CommandError("Subscription not found.")
+
+        path = options['path']
+        file_format = options['format'] or ('csv' if path.endswith('.csv') else 'ndjson')
+        renderer = CSVRenderer() if file_format == 'csv' else NDJSONRenderer()
+
+        rows = export_rows(Product.objects.filter(subscription=subscription), options['chunk_size'])
+        chunks = renderer.stream(rows, EXPORT_FIELDS)
+        if path == '-':
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+            return
+
+        with open(path, 'wb') as handle:
+            for chunk in chunks:
+                handle.write(chunk)
+        self.stdout.write(self.style.SUCCESS(f"Exported products to {path}."))
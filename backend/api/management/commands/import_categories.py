@@ -0,0 +1,53 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from api.parsers import iter_csv
+from api.products.taxonomy import CategoryImporter, paths_from_rows, paths_from_tree
+from subscriptions.models import Subscription
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a category taxonomy for a subscription from nested JSON or "
+        "from CSV with a `path` column (e.g. 'Electronics > Phones')."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('subscription', help="Subscription id")
+        parser.add_argument('path', help="File to import")
+        parser.add_argument(
+            '--format',
+            choices=['json', 'csv'],
+            help="Input format (default: guessed from the file extension)"
+        )
+        parser.add_argument('--separator', default='>', help="Path separator for CSV input")
+
+    def handle(self, *args, **options):
+        try:
+            subscription = Subscription.objects.get(pk=options['subscription'])
+        except (Subscription.DoesNotExist, ValidationError):
+            raise CommandError("Subscription not found.")
+
+        path = options['path']
+        file_format = options['format'] or ('csv' if path.endswith('.csv') else 'json')
+        with open(path, 'rb') as handle:
+            if file_format == 'csv':
+                paths = paths_from_rows(iter_csv(handle), options['separator'])
+                result = CategoryImporter(subscription).run(paths)
+            else:
+                try:
+                    nodes = json.load(handle)
+                except ValueError as exc:
+                    raise CommandError(f"Invalid JSON: {exc}")
+                if not isinstance(nodes, list):
+                    raise CommandError("Expected a list of categories.")
+                result = CategoryImporter(subscription).run(paths_from_tree(nodes))
+
+        for error in result['errors']:
+            self.stderr.write(f"row {error['row']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result['created']} categor{'y' if result['created'] == 1 else 'ies'}, "
+            f"{result['failed']} row(s) failed."
+        ))
@@ -0,0 +1,40 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from api.parsers import iter_csv, iter_ndjson
+from api.products.importer import ProductImporter
+from subscriptions.models import Subscription
+
+
+class Command(BaseCommand):
+    help = "Import products for a subscription from an NDJSON or CSV file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('subscription', help="Subscription id")
+        parser.add_argument('path', help="File to import")
+        parser.add_argument(
+            '--format',
+            choices=['ndjson', 'csv'],
+            help="Input format (default: guessed from the file extension)"
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            subscription = Subscription.objects.get(pk=options['subscription'])
+        except (Subscription.DoesNotExist, ValidationError):
+            raise CommandError("Subscription not found.")
+
+        path = options['path']
+        file_format = options['format'] or ('csv' if path.endswith('.csv') else 'ndjson')
+        iter_rows = iter_csv if file_format == 'csv' else iter_ndjson
+
+        importer = ProductImporter(subscription, chunk_size=options['chunk_size'])
+        with open(path, 'rb') as handle:
+            result = importer.run(iter_rows(handle))
+
+        for error in result['errors']:
+            self.stderr.write(f"row {error['row']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['created']} product(s), {result['failed']} row(s) failed."
+        ))
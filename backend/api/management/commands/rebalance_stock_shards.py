@@ -0,0 +1,53 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from api.products.models import Product
+from api.products.sharding import refresh_sharded_stock, reshard
+
+
+class Command(BaseCommand):
+    help = (
+        "Spread the stock of sharded products evenly over their shards and "
+        "refresh Product.stock. With --product, (un)shard a single product."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--product', help="Only this product id")
+        parser.add_argument(
+            '--shards',
+            type=int,
+            help="With --product: new number of shards (0 moves the stock back onto the product)"
+        )
+        parser.add_argument(
+            '--refresh-only',
+            action='store_true',
+            help="Only refresh the cached Product.stock totals; cheap enough to run every minute"
+        )
+
+    def handle(self, *args, **options):
+        if options['refresh_only']:
+            refreshed = refresh_sharded_stock()
+            self.stdout.write(self.style.SUCCESS(f"Refreshed stock of {refreshed} product(s)."))
+            return
+
+        if options['shards'] is not None:
+            if not options['product']:
+                raise CommandError("--shards requires --product.")
+            if not 0 <= options['shards'] <= 256:
+                raise CommandError("--shards must be between 0 and 256.")
+
+        products = Product.objects.filter(stock_shard_count__gt=0)
+        if options['product']:
+            try:
+                products = Product.objects.filter(pk=options['product'])
+            except ValidationError:
+                raise CommandError("Invalid product id.")
+        rows = list(products.values_list('pk', 'stock_shard_count'))
+        if options['product'] and not rows:
+            raise CommandError("Product not found.")
+
+        for pk, shard_count in rows:
+            shards = options['shards'] if options['shards'] is not None else shard_count
+            total = reshard(pk, shards)
+            self.stdout.write(f"{pk}: {total} in stock over {shards} shard(s)")
+        self.stdout.write(self.style.SUCCESS(f"Rebalanced {len(rows)} product(s)."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.products.inventory import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = (
+        "Release expired stock holds, returning their stock to the products. "
+        "Run it periodically (e.g. every minute from cron)."
+    )
+
+    def handle(self, *args, **options):
+        released = release_expired_reservations()
+        self.stdout.write(self.style.SUCCESS(f"Released {released} reservation(s)."))
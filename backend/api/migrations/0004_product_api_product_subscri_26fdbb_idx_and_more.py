@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_alter_product_options_product_created_at_and_more'),
+        ('subscriptions', '0004_subscription_quota_exceeded'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['subscription', 'created_at', 'id'], name='api_product_subscri_26fdbb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['subscription', 'price', 'id'], name='api_product_subscri_07923a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['subscription', 'name', 'id'], name='api_product_subscri_b7f0ee_idx'),
+        ),
+    ]
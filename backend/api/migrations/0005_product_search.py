@@ -0,0 +1,76 @@
+from django.db import migrations
+
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE api_product ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english'::regconfig, coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX api_product_search_vector_gin ON api_product USING gin (search_vector)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS api_product_search_vector_gin",
+    "ALTER TABLE api_product DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE api_product_fts USING fts5(
+        product_id UNINDEXED, subscription_id UNINDEXED, name, description
+    )
+    """,
+]
+
+SQLITE_REVERSE = [
+    "DROP TABLE IF EXISTS api_product_fts",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        for sql in statements.get(vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+def backfill_sqlite_index(apps, schema_editor):
+    # Self-contained on purpose: mirrors SQLiteSearchBackend.index() as of
+    # this migration, so later changes to the backend can't break it.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    Product = apps.get_model('api', 'Product')
+    products = Product.objects.only('id', 'subscription_id', 'name', 'description')
+    rows = (
+        # rowid derived from the product UUID, as the backend computes it
+        (p.pk.int >> 65, p.pk.hex, p.subscription_id.hex, p.name, p.description or '')
+        for p in products.iterator(chunk_size=2000)
+    )
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO api_product_fts (rowid, product_id, subscription_id, name, description) '
+            'VALUES (%s, %s, %s, %s, %s)',
+            rows,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_product_api_product_subscri_26fdbb_idx_and_more'),
+    ]
+
+    # The search column and index are vendor specific and invisible to the
+    # ORM, so they are managed with raw SQL rather than model fields.
+    operations = [
+        migrations.RunPython(
+            _run({'postgresql': POSTGRES_FORWARD, 'sqlite': SQLITE_FORWARD}),
+            _run({'postgresql': POSTGRES_REVERSE, 'sqlite': SQLITE_REVERSE}),
+        ),
+        migrations.RunPython(backfill_sqlite_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_product_search'),
+        ('subscriptions', '0004_subscription_quota_exceeded'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['tree_id', 'lft', 'rght'], name='api_category_tree_range_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['subscription', 'is_active', 'price'], name='api_product_subscri_2ee44e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['subscription', 'category', 'is_active'], name='api_product_subscri_8968e8_idx'),
+        ),
+    ]
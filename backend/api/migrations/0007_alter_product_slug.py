@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_category_api_category_tree_range_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='slug',
+            field=models.SlugField(help_text='URL-friendly identifier for the product', max_length=255),
+        ),
+    ]
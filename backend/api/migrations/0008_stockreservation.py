@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:55
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_alter_product_slug'),
+        ('subscriptions', '0004_subscription_quota_exceeded'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('hold_id', models.UUIDField(db_index=True, help_text='Groups the items reserved together in one request')),
+                ('quantity', models.PositiveIntegerField()),
+                ('expires_at', models.DateTimeField(db_index=True, help_text='When the hold is released automatically')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='api.product')),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_reservations', to='subscriptions.subscription')),
+            ],
+        ),
+    ]
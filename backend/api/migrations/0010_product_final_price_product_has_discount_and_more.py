@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_product_stock_shard_count_stockshard'),
+        ('subscriptions', '0004_subscription_quota_exceeded'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='final_price',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(discount_price__gt=0, then=models.F('discount_price')), default=models.F('price')), help_text='Price the customer pays: the discount price if set, else the price', output_field=models.DecimalField(decimal_places=2, max_digits=10)),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='has_discount',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(discount_price__lt=models.F('price'), then=models.Value(True)), default=models.Value(False)), help_text='Whether a discount price below the regular price is set', output_field=models.BooleanField()),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['subscription', 'final_price', 'id'], name='api_product_subscri_d02ce9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['subscription', 'has_discount', 'final_price'], name='api_product_subscri_5e9a44_idx'),
+        ),
+    ]
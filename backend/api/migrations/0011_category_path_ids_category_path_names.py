@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:15
+
+from django.db import migrations, models
+
+
+def backfill_paths(apps, schema_editor):
+    Category = apps.get_model('api', 'Category')
+    nodes = list(Category.objects.order_by('tree_id', 'lft').only('id', 'name', 'parent_id'))
+    paths = {}
+    for node in nodes:
+        names, ids = paths.get(node.parent_id, ([], []))
+        node.path_names, node.path_ids = names + [node.name], ids + [str(node.pk)]
+        paths[node.pk] = (node.path_names, node.path_ids)
+    Category.objects.bulk_update(nodes, ['path_names', 'path_ids'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_product_final_price_product_has_discount_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='path_ids',
+            field=models.JSONField(default=list, editable=False, help_text='Ids from the root down to this category, matching path_names'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path_names',
+            field=models.JSONField(default=list, editable=False, help_text='Names from the root down to this category, for breadcrumbs'),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:16
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_category_path_ids_category_path_names'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Sum of the line totals at the time the order was placed', max_digits=14),
+        ),
+        migrations.CreateModel(
+            name='OrderItem',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('line_number', models.PositiveIntegerField(help_text='Position of the line within its order, from 1')),
+                ('product_name', models.CharField(help_text='Product name at the time of ordering', max_length=100)),
+                ('unit_price', models.DecimalField(decimal_places=2, help_text="Price paid per unit (the product's final price at the time of ordering)", max_digits=10)),
+                ('quantity', models.PositiveIntegerField()),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='api.order')),
+                ('product', models.ForeignKey(help_text='Ordered product; kept as null if the product is deleted later', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='order_items', to='api.product')),
+            ],
+            options={
+                'ordering': ['order', 'line_number'],
+                'constraints': [models.UniqueConstraint(fields=('order', 'line_number'), name='unique_order_line_number')],
+            },
+        ),
+    ]
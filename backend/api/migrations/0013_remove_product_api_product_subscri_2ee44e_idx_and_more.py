@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_order_total_amount_orderitem'),
+        ('subscriptions', '0004_subscription_quota_exceeded'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='api_product_subscri_2ee44e_idx',
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['subscription', 'is_active', 'final_price'], name='api_product_subscri_e0a905_idx'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models 
 from subscriptions.models import Subscription
+from api.products.models import Product
 import uuid
 import ulid
 
@@ -17,7 +18,57 @@ class Order(models.Model):
         default=generate_ulid,
         editable=False
     )
+    total_amount = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        help_text="Sum of the line totals at the time the order was placed"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"Order ID: {self.order_number}"
+
+
+class OrderItem(models.Model):
+    """
+    One order line. Name and unit price are copied from the product when
+    the order is placed, so later catalog changes don't alter the order.
+    """
+    id = models.UUIDField(
+        primary_key=True, default=uuid.uuid4, editable=False, unique=True
+    )
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='order_items',
+        help_text="Ordered product; kept as null if the product is deleted later"
+    )
+    line_number = models.PositiveIntegerField(
+        help_text="Position of the line within its order, from 1"
+    )
+    product_name = models.CharField(
+        max_length=100,
+        help_text="Product name at the time of ordering"
+    )
+    unit_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        help_text="Price paid per unit (the product's final price at the time of ordering)"
+    )
+    quantity = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ['order', 'line_number']
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'line_number'], name='unique_order_line_number'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_name}"
+
+    @property
+    def line_total(self):
+        return self.unit_price * self.quantity
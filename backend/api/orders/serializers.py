@@ -1,9 +1,81 @@
+from decimal import Decimal
+
+from django.db import transaction
 from rest_framework import serializers
+from api.products.models import Product
 from .models import (
-    Order
+    Order,
+    OrderItem,
 )
 
+
+class OrderItemSerializer(serializers.ModelSerializer):
+    product_id = serializers.UUIDField()
+    # The upper bound is the integer column's range on every backend.
+    quantity = serializers.IntegerField(min_value=1, max_value=2**31 - 1)
+    line_total = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = OrderItem
+        fields = ['id', 'product_id', 'line_number', 'product_name', 'unit_price', 'quantity', 'line_total']
+        read_only_fields = ['line_number', 'product_name', 'unit_price']
+
+
 class OrderSerializer(serializers.ModelSerializer):
+    items = OrderItemSerializer(many=True, allow_empty=False, max_length=1000)
+
     class Meta:
         model = Order
-        fields = ['id', 'order_number', 'created_at']
+        fields = ['id', 'order_number', 'items', 'total_amount', 'created_at']
+        read_only_fields = ['total_amount']
+
+    @staticmethod
+    def max_total_amount():
+        # First amount that no longer fits Order.total_amount.
+        field = Order._meta.get_field('total_amount')
+        return Decimal(10) ** (field.max_digits - field.decimal_places)
+
+    def create(self, validated_data):
+        """
+        Create the order and all its lines in one transaction: the products
+        are looked up with a single in_bulk() query and the lines inserted
+        with one bulk_create(), so the cost doesn't grow with the line count.
+        """
+        lines = validated_data.pop('items')
+        subscription = validated_data['subscription']
+        products = Product.objects.filter(subscription=subscription, is_active=True).only(
+            'id', 'name', 'final_price'
+        ).in_bulk({line['product_id'] for line in lines})
+
+        errors = [
+            {} if line['product_id'] in products
+            else {'product_id': ['Product not found or inactive.']}
+            for line in lines
+        ]
+        if any(errors):
+            raise serializers.ValidationError({'items': errors})
+
+        order = Order(**validated_data)
+        items = []
+        for number, line in enumerate(lines, start=1):
+            product = products[line['product_id']]
+            items.append(OrderItem(
+                order=order,
+                product=product,
+                line_number=number,
+                product_name=product.name,
+                unit_price=product.final_price,
+                quantity=line['quantity'],
+            ))
+        order.total_amount = sum(item.line_total for item in items)
+        if order.total_amount >= self.max_total_amount():
+            raise serializers.ValidationError({
+                'non_field_errors': ['The order total is too large.']
+            })
+
+        with transaction.atomic():
+            order.save(force_insert=True)
+            OrderItem.objects.bulk_create(items)
+        # Serve the response from the lines just built instead of re-reading them.
+        order._prefetched_objects_cache = {'items': items}
+        return order
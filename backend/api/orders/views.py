@@ -1,4 +1,8 @@
 from rest_framework import generics
+
+from authentication.authentication import APIKeyAuthentication
+from subscriptions.permissions import HasValidSubscription
+from subscriptions.throttling import PlanRateThrottle
 from .models import (
     Order
 )
@@ -8,9 +12,14 @@ from .serializers import (
 
 class OrderListCreateView(generics.ListCreateAPIView):
     serializer_class = OrderSerializer
+    permission_classes = [HasValidSubscription]
+    authentication_classes = [APIKeyAuthentication]
+    throttle_classes = [PlanRateThrottle]
 
     def get_queryset(self):
-        return Order.objects.filter(subscription=self.request.subscription)
+        return Order.objects.filter(
+            subscription=self.request.subscription
+        ).prefetch_related('items').order_by('-created_at')
 
     def perform_create(self, serializer):
         serializer.save(subscription=self.request.subscription)
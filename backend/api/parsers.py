@@ -0,0 +1,136 @@
+import codecs
+import csv
+import io
+import json
+import re
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class RowError:
+    """Placeholder yielded for an input row that could not be decoded."""
+
+    def __init__(self, message):
+        self.message = message
+
+
+def iter_ndjson(lines, encoding='utf-8'):
+    """Yield one dict (or RowError) per non-blank line of newline-delimited JSON."""
+    for line in lines:
+        if isinstance(line, bytes):
+            try:
+                line = line.decode(encoding)
+            except UnicodeDecodeError as exc:
+                yield RowError(f'Invalid {encoding} text: {exc}')
+                continue
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield RowError(f'Invalid JSON: {exc}')
+            continue
+        if not isinstance(row, dict):
+            yield RowError('Expected a JSON object.')
+            continue
+        yield row
+
+
+def iter_csv(lines, encoding='utf-8'):
+    """
+    Yield one dict (or RowError) per CSV record; empty cells are treated as
+    missing. Only a header that can't be read fails the whole body.
+    """
+    decode_errors = []
+
+    def decoded():
+        for line in lines:
+            if isinstance(line, bytes):
+                try:
+                    line = line.decode(encoding)
+                except UnicodeDecodeError as exc:
+                    # A blank line keeps the reader in step with the input.
+                    decode_errors.append(f'Invalid {encoding} text: {exc}')
+                    line = '\n'
+            yield line
+
+    reader = csv.reader(decoded())
+    header = None
+    while True:
+        try:
+            record = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as exc:
+            if header is None:
+                raise ParseError(f'CSV parse error - {exc}')
+            yield RowError(f'Invalid CSV: {exc}')
+            continue
+        if decode_errors:
+            if header is None:
+                raise ParseError(f'CSV parse error - {decode_errors[0]}')
+            # The record holds the undecodable line(s): report it once.
+            yield RowError(decode_errors[0])
+            decode_errors.clear()
+            continue
+        if not record:
+            continue
+        if header is None:
+            header = record
+            continue
+        yield {key: value for key, value in zip(header, record) if key and value != ''}
+
+
+class NDJSONParser(BaseParser):
+    """
+    Streams newline-delimited JSON. `request.data` is a lazy iterator of
+    rows, so the body is never held in memory as a whole.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        return iter_ndjson(stream if stream is not None else [], encoding)
+
+
+class CSVParser(BaseParser):
+    """Streams CSV with a header row; `request.data` is a lazy iterator of rows."""
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        return iter_csv(stream if stream is not None else [], encoding)
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSONParser using orjson when it is installed, for UTF-8 bodies. Bodies
+    orjson rejects (invalid JSON, NaN, ...) are handed to JSONParser, so
+    what is accepted and the errors raised don't change. So are bodies with
+    a run of 19 or more digits: orjson would read integers beyond 64 bits
+    as floats.
+    """
+    long_number = re.compile(rb'\d{19}')
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        body = stream.read()
+        try:
+            if codecs.lookup(encoding).name == 'utf-8' and not self.long_number.search(body):
+                return orjson.loads(body)
+        except (orjson.JSONDecodeError, LookupError):
+            pass
+        return super().parse(io.BytesIO(body), media_type, parser_context)
@@ -0,0 +1,107 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import serializers
+
+from .caching import PRODUCTS, catalog_versions
+from .models import Product
+from .sharding import set_sharded_stock
+
+
+class ProductBulkUpdateItemSerializer(serializers.Serializer):
+    """One entry of a bulk update: the product (by id or slug) and its new values."""
+    UPDATABLE_FIELDS = ('price', 'discount_price', 'stock', 'is_active')
+
+    id = serializers.UUIDField(required=False)
+    slug = serializers.SlugField(max_length=255, required=False)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'), required=False)
+    discount_price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=Decimal('0.01'), required=False, allow_null=True
+    )
+    stock = serializers.IntegerField(min_value=0, required=False)
+    is_active = serializers.BooleanField(required=False)
+
+    def validate(self, data):
+        if ('id' in data) == ('slug' in data):
+            raise serializers.ValidationError('Provide exactly one of "id" or "slug".')
+        if not any(field in data for field in self.UPDATABLE_FIELDS):
+            raise serializers.ValidationError(
+                f"Provide at least one of: {', '.join(self.UPDATABLE_FIELDS)}."
+            )
+        return data
+
+
+class ProductBulkUpdater:
+    """
+    Applies partial updates to many products of one subscription. Products
+    are resolved with one query and written with bulk_update, grouped by the
+    set of columns each item changes so only those columns (and updated_at)
+    are written.
+    """
+    batch_size = 1000
+
+    def __init__(self, subscription):
+        self.subscription = subscription
+        self.serializer = ProductBulkUpdateItemSerializer()
+
+    def run(self, items):
+        self.errors = []
+        valid = []
+        for index, item in enumerate(items):
+            try:
+                valid.append((index, self.serializer.run_validation(item)))
+            except serializers.ValidationError as exc:
+                self.errors.append({'index': index, 'errors': exc.detail})
+
+        products = self.resolve(valid)
+
+        # product id -> merged changes; later items win over earlier ones.
+        changes = {}
+        for index, data in valid:
+            product = products['id'].get(data.get('id')) or products['slug'].get(data.get('slug'))
+            if product is None:
+                self.errors.append({'index': index, 'errors': {'non_field_errors': ['Product not found.']}})
+                continue
+            fields = {field: data[field] for field in ProductBulkUpdateItemSerializer.UPDATABLE_FIELDS if field in data}
+            changes.setdefault(product.pk, (product, {}))[1].update(fields)
+
+        groups = defaultdict(list)
+        now = timezone.now()
+        for product, fields in changes.values():
+            for field, value in fields.items():
+                setattr(product, field, value)
+            product.updated_at = now
+            groups[tuple(sorted(fields))].append(product)
+
+        with transaction.atomic():
+            for fields, group in groups.items():
+                Product.objects.bulk_update(group, [*fields, 'updated_at'], batch_size=self.batch_size)
+            # The stock of sharded products lives in their shards.
+            for product, fields in changes.values():
+                if 'stock' in fields and product.stock_shard_count:
+                    set_sharded_stock(product.pk, product.stock_shard_count, fields['stock'])
+            if changes:
+                catalog_versions.bump(self.subscription.pk, PRODUCTS)
+
+        return {
+            'updated': len(changes),
+            'failed': len(self.errors),
+            'errors': sorted(self.errors, key=lambda error: error['index']),
+        }
+
+    def resolve(self, valid):
+        ids = {data['id'] for _, data in valid if 'id' in data}
+        slugs = {data['slug'] for _, data in valid if 'slug' in data}
+        found = {'id': {}, 'slug': {}}
+        if not ids and not slugs:
+            return found
+        queryset = Product.objects.filter(subscription=self.subscription).filter(
+            Q(pk__in=ids) | Q(slug__in=slugs)
+        ).only('id', 'slug', 'stock_shard_count')
+        for product in queryset:
+            found['id'][product.pk] = product
+            found['slug'][product.slug] = product
+        return found
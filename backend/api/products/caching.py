@@ -0,0 +1,155 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control
+from rest_framework.response import Response
+
+DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    'KEY_PREFIX': 'catalog:',
+    'RESPONSE_TIMEOUT': 300,
+}
+
+PRODUCTS = 'products'
+CATEGORIES = 'categories'
+
+
+class CatalogVersions:
+    """
+    A version token per subscription and collection (products, categories),
+    kept in the shared cache. Any write to a collection replaces its token
+    with the current time in nanoseconds, so reading the version is a single
+    cache lookup instead of a max(updated_at) query.
+
+    Tokens are bumped when the writing transaction commits; a reader can't
+    pair the new token with data from before the write. An evicted token is
+    recreated as "now", which only costs clients one full response.
+    """
+
+    def __init__(self, options=None):
+        self.options = {**DEFAULTS, **(options or {})}
+        self.cache = caches[self.options['CACHE_ALIAS']]
+
+    def _key(self, subscription_id, kind):
+        return f"{self.options['KEY_PREFIX']}{subscription_id}:{kind}"
+
+    def get_many(self, subscription_id, kinds):
+        """Return {kind: token} for `kinds`, creating missing tokens."""
+        keys = {self._key(subscription_id, kind): kind for kind in kinds}
+        found = self.cache.get_many(list(keys))
+        for key in keys.keys() - found.keys():
+            self.cache.add(key, time.time_ns(), None)
+            found[key] = self.cache.get(key) or time.time_ns()
+        return {kind: found[key] for key, kind in keys.items()}
+
+    def bump(self, subscription_ids, *kinds):
+        """Mark `kinds` of the given subscription(s) as changed once the current transaction commits."""
+        if not isinstance(subscription_ids, (list, tuple, set, frozenset)):
+            subscription_ids = [subscription_ids]
+        keys = [self._key(pk, kind) for pk in subscription_ids for kind in kinds]
+        if keys:
+            transaction.on_commit(lambda: self._set(keys))
+
+    def _set(self, keys):
+        token = time.time_ns()
+        self.cache.set_many({key: token for key in keys}, None)
+
+
+class ResponseCache:
+    """
+    Serialized catalog responses, keyed by a digest of the subscription,
+    its collection versions and the request (see ConditionalGetMixin). A
+    write bumps the version, so later requests simply use new keys:
+    nothing is scanned or deleted, and stale entries age out after
+    RESPONSE_TIMEOUT seconds. Hit and miss counts are kept per process.
+    """
+
+    def __init__(self, options=None):
+        self.options = {**DEFAULTS, **(options or {})}
+        self.cache = caches[self.options['CACHE_ALIAS']]
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def _key(self, digest):
+        return f"{self.options['KEY_PREFIX']}response:{digest}"
+
+    def get(self, digest):
+        data = self.cache.get(self._key(digest))
+        with self._stats_lock:
+            self._stats['hits' if data is not None else 'misses'] += 1
+        return data
+
+    def set(self, digest, data):
+        self.cache.set(self._key(digest), data, self.options['RESPONSE_TIMEOUT'])
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats = {'hits': 0, 'misses': 0}
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+
+catalog_versions = CatalogVersions(getattr(settings, 'CATALOG_CACHE', None))
+response_cache = ResponseCache(getattr(settings, 'CATALOG_CACHE', None))
+
+
+class ConditionalGetMixin:
+    """
+    Adds an ETag to GET responses of a catalog view, built from the
+    subscription's collection versions, and answers a matching
+    If-None-Match with 304 before the queryset is evaluated or anything is
+    serialized. Other responses are served from
+    the response cache when the same request was answered at the current
+    versions (set `cache_responses = False` to opt out).
+
+    The ETag also covers the absolute URL (scheme, host, path and query)
+    and the Accept header, so each filter, page and format has its own
+    tag, and cached pagination links always point at the requested host.
+
+    There is deliberately no Last-Modified: HTTP dates have whole-second
+    precision, so a write in the same second as an earlier response would
+    leave If-Modified-Since answering 304 for changed data.
+    """
+    catalog_kinds = (PRODUCTS,)
+    cache_responses = True
+
+    def get_catalog_versions(self, request):
+        return catalog_versions.get_many(request.subscription.pk, self.catalog_kinds)
+
+    def get(self, request, *args, **kwargs):
+        versions = self.get_catalog_versions(request)
+        digest = hashlib.sha1(':'.join([
+            str(request.subscription.pk),
+            *(str(versions[kind]) for kind in self.catalog_kinds),
+            request.build_absolute_uri(),
+            request.META.get('HTTP_ACCEPT', ''),
+        ]).encode()).hexdigest()
+        etag = f'"{digest}"'
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None and self.cache_responses:
+            data = response_cache.get(digest)
+            if data is not None:
+                response = Response(data)
+                response['X-Cache'] = 'HIT'
+            else:
+                response = super().get(request, *args, **kwargs)
+                if response.status_code == 200:
+                    response_cache.set(digest, response.data)
+                response['X-Cache'] = 'MISS'
+        elif response is None:
+            response = super().get(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            # Responses are per API key; shared caches must not reuse them.
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
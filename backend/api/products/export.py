@@ -0,0 +1,29 @@
+EXPORT_FIELDS = (
+    'id',
+    'category_id',
+    'name',
+    'slug',
+    'description',
+    'price',
+    'discount_price',
+    'stock',
+    'is_active',
+    'created_at',
+    'updated_at',
+)
+
+
+def export_rows(queryset, chunk_size=2000):
+    """
+    Iterate the products of `queryset` as plain dicts of EXPORT_FIELDS.
+    Rows are fetched `chunk_size` at a time (through a server-side cursor on
+    PostgreSQL) and no model instances are built, so memory stays flat no
+    matter how large the catalog is. The column names match the importer's,
+    so an export can be imported again.
+    """
+    return (
+        queryset.order_by('created_at', 'pk')
+        .values(*EXPORT_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+
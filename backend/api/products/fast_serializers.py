@@ -0,0 +1,193 @@
+from datetime import timezone as dt_timezone
+from operator import itemgetter
+
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+
+class Column:
+    """Output `name` taken from the `source` column, optionally converted."""
+
+    def __init__(self, name, source=None, convert=None):
+        self.name = name
+        self.sources = (source or name,)
+        self.convert = convert
+
+    def get_converter(self):
+        return self.convert
+
+    def compile(self, indices):
+        get = itemgetter(indices[0])
+        convert = self.get_converter()
+        if convert is None:
+            return get
+
+        def accessor(row):
+            value = get(row)
+            return None if value is None else convert(value)
+        return accessor
+
+
+def decimal_to_representation(max_digits, decimal_places):
+    """
+    DRF's DecimalField output. Values read from a column with the same
+    decimal_places already have the right exponent and only need
+    formatting; anything else goes through DRF.
+    """
+    fallback = serializers.DecimalField(max_digits=max_digits, decimal_places=decimal_places).to_representation
+    if not api_settings.COERCE_DECIMAL_TO_STRING:
+        return fallback
+
+    def convert(value):
+        text = format(value, 'f')
+        if text[-decimal_places - 1:-decimal_places] == '.':
+            return text
+        return fallback(value)
+    return convert
+
+
+def datetime_to_representation():
+    """
+    DRF's DateTimeField output. While UTC is the active timezone, UTC
+    values skip the timezone conversion; anything else goes through DRF.
+    """
+    fallback = serializers.DateTimeField().to_representation
+    if api_settings.DATETIME_FORMAT != ISO_8601:
+        return fallback
+    if getattr(timezone.get_current_timezone(), 'key', None) != 'UTC':
+        return fallback
+
+    def convert(value):
+        if value.tzinfo is dt_timezone.utc:
+            return value.isoformat()[:-6] + 'Z'
+        return fallback(value)
+    return convert
+
+
+class DecimalColumn(Column):
+    def __init__(self, name, max_digits, decimal_places, source=None):
+        super().__init__(name, source, decimal_to_representation(max_digits, decimal_places))
+
+
+class DateTimeColumn(Column):
+    """
+    The active timezone is resolved when the serializer is instantiated
+    rather than per value, so create one serializer per request.
+    """
+
+    def get_converter(self):
+        return datetime_to_representation()
+
+
+class Computed:
+    """Output `name` computed by `func` from the `sources` columns."""
+
+    def __init__(self, name, sources, func):
+        self.name = name
+        self.sources = tuple(sources)
+        self.func = func
+
+    def compile(self, indices):
+        func = self.func
+        if len(indices) == 1:
+            get = itemgetter(indices[0])
+            return lambda row: func(get(row))
+        get = itemgetter(*indices)
+        return lambda row: func(*get(row))
+
+
+class Nested:
+    """Output `name` as a dict built from its own `fields`."""
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+        self.sources = tuple(source for field in fields for source in field.sources)
+
+    def compile(self, indices):
+        accessors = []
+        position = 0
+        for field in self.fields:
+            count = len(field.sources)
+            accessors.append((field.name, field.compile(indices[position:position + count])))
+            position += count
+        return lambda row: {name: accessor(row) for name, accessor in accessors}
+
+
+class FastSerializer:
+    """
+    Read-only serializer that turns `values_list()` rows into dicts. Each
+    field's accessor is compiled once, against the column positions, when
+    the serializer is instantiated, so per row there is only tuple indexing
+    and the conversions themselves; no model instances or serializer fields
+    are built. Subclasses list their output `fields` in order; pass `only`
+    to output (and select) just the named ones.
+    """
+    fields = ()
+
+    def __init__(self, only=None):
+        fields = [field for field in self.fields if only is None or field.name in only]
+        columns = []
+        for field in fields:
+            for source in field.sources:
+                if source not in columns:
+                    columns.append(source)
+        self.columns = tuple(columns)
+        self._accessors = [
+            (field.name, field.compile([columns.index(source) for source in field.sources]))
+            for field in fields
+        ]
+
+    @classmethod
+    def field_names(cls):
+        return [field.name for field in cls.fields]
+
+    def rows(self, queryset, extra=()):
+        """
+        Restrict `queryset` to the columns this serializer reads, plus any
+        `extra` columns other code needs. Rows are named tuples, so code
+        reading attributes (like KeysetPagination's cursors) works on them
+        as on model instances.
+        """
+        columns = self.columns + tuple(column for column in extra if column not in self.columns)
+        return queryset.values_list(*columns, named=True)
+
+    def to_representation(self, row):
+        return {name: accessor(row) for name, accessor in self._accessors}
+
+    def serialize(self, rows):
+        to_representation = self.to_representation
+        return [to_representation(row) for row in rows]
+
+
+def breadcrumb(path_ids, path_names):
+    return [{'id': pk, 'name': name} for pk, name in zip(path_ids, path_names)]
+
+
+class ProductFastSerializer(FastSerializer):
+    """
+    Same output as ProductListSerializer. Conversions reuse DRF's field
+    instances so decimals and datetimes render identically; `final_price`
+    and `has_discount` come from their stored columns.
+    """
+    fields = (
+        Column('id', convert=str),
+        Nested('category', [
+            Column('id', 'category_id', convert=str),
+            Column('name', 'category__name'),
+            Computed('breadcrumb', ['category__path_ids', 'category__path_names'], breadcrumb),
+        ]),
+        Column('name'),
+        Column('slug'),
+        Column('description'),
+        DecimalColumn('price', max_digits=10, decimal_places=2),
+        DecimalColumn('discount_price', max_digits=10, decimal_places=2),
+        Column('final_price'),
+        Column('has_discount'),
+        Column('stock'),
+        Computed('is_in_stock', ['stock'], lambda stock: stock > 0),
+        Column('is_active'),
+        DateTimeColumn('created_at'),
+        DateTimeColumn('updated_at'),
+    )
@@ -0,0 +1,43 @@
+from rest_framework.exceptions import ValidationError
+
+# Model fields behind ProductSerializer outputs that aren't plain columns.
+PRODUCT_FIELD_SOURCES = {
+    'final_price': ('price', 'discount_price'),
+    'is_in_stock': ('stock',),
+}
+
+
+def _names(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+def requested_fields(request, available):
+    """
+    The output fields picked with `?fields=` (keep only these) and `?omit=`
+    (drop these), in the order of `available`. Returns None when neither
+    parameter is given, i.e. all fields are wanted.
+    """
+    params = request.query_params
+    if 'fields' not in params and 'omit' not in params:
+        return None
+
+    fields, omit = _names(params.get('fields')), _names(params.get('omit'))
+    for param, names in (('fields', fields), ('omit', omit)):
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            raise ValidationError({
+                param: f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(available)}."
+            })
+
+    selected = [name for name in available if (not fields or name in fields) and name not in omit]
+    if not selected:
+        raise ValidationError({'fields': 'At least one field must be left.'})
+    return selected
+
+
+def product_columns(fields, *extra):
+    """Product model fields to load with .only() for the output `fields`."""
+    columns = ['id', *extra]
+    for name in fields:
+        columns.extend(PRODUCT_FIELD_SOURCES.get(name, (name,)))
+    return list(dict.fromkeys(columns))
@@ -0,0 +1,80 @@
+import uuid
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Subquery
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Category
+
+
+class ProductFilterBackend(BaseFilterBackend):
+    """
+    Product listing filters:
+
+    - `category`: products in that category or any of its descendants,
+      resolved as a tree_id/lft/rght range on the category join so the
+      subtree depth doesn't matter.
+    - `min_price` / `max_price`: inclusive bounds on `final_price`, the
+      price the customer pays (indexed with the subscription).
+    - `is_active`: `true` or `false`.
+    - `on_sale`: `true` for discounted products (indexed `has_discount`).
+    """
+    boolean_values = {'true': True, '1': True, 'false': False, '0': False}
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        category = params.get('category')
+        if category:
+            queryset = self.filter_category(request, queryset, self.parse_uuid('category', category))
+
+        is_active = params.get('is_active')
+        if is_active is not None:
+            queryset = queryset.filter(is_active=self.parse_bool('is_active', is_active))
+
+        on_sale = params.get('on_sale')
+        if on_sale is not None:
+            queryset = queryset.filter(has_discount=self.parse_bool('on_sale', on_sale))
+
+        min_price = params.get('min_price')
+        if min_price:
+            queryset = queryset.filter(final_price__gte=self.parse_decimal('min_price', min_price))
+
+        max_price = params.get('max_price')
+        if max_price:
+            queryset = queryset.filter(final_price__lte=self.parse_decimal('max_price', max_price))
+
+        return queryset
+
+    def filter_category(self, request, queryset, category_id):
+        node = Category.objects.filter(subscription=request.subscription, pk=category_id)
+        return queryset.filter(
+            category__tree_id=Subquery(node.values('tree_id')),
+            category__lft__gte=Subquery(node.values('lft')),
+            category__rght__lte=Subquery(node.values('rght')),
+        )
+
+    def parse_bool(self, name, value):
+        try:
+            return self.boolean_values[value.lower()]
+        except KeyError:
+            raise ValidationError({name: 'Must be true or false.'})
+
+    @staticmethod
+    def parse_uuid(name, value):
+        try:
+            return uuid.UUID(value)
+        except ValueError:
+            raise ValidationError({name: 'Must be a valid UUID.'})
+
+    @staticmethod
+    def parse_decimal(name, value):
+        try:
+            number = Decimal(value)
+        except InvalidOperation:
+            number = None
+        # Decimal() also accepts NaN and Infinity, which aren't usable bounds.
+        if number is None or not number.is_finite():
+            raise ValidationError({name: 'Must be a number.'})
+        return number
@@ -0,0 +1,161 @@
+import uuid
+from decimal import Decimal
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+from api.parsers import RowError
+from api.utils import SlugAllocator
+from .caching import PRODUCTS, catalog_versions
+from .models import Category, Product
+from .search import get_search_backend
+
+
+class ProductImportSerializer(serializers.Serializer):
+    """
+    Validates one import row. A plain Serializer on purpose: ModelSerializer
+    would add a uniqueness query per row for `slug`, which the importer
+    instead resolves once per chunk.
+    """
+    category_id = serializers.UUIDField()
+    name = serializers.CharField(max_length=100)
+    slug = serializers.SlugField(max_length=255, required=False)
+    description = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+    discount_price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=Decimal('0.01'), required=False, allow_null=True
+    )
+    stock = serializers.IntegerField(min_value=0, required=False, default=0)
+    is_active = serializers.BooleanField(required=False, default=True)
+
+
+class ProductImporter:
+    """
+    Imports an iterable of product rows in chunks: each chunk is validated,
+    its categories and slugs are checked with one query each and the valid
+    rows are written with a single bulk_create. Only one chunk is held in
+    memory at a time.
+    """
+    max_reported_errors = 1000
+    insert_attempts = 3
+
+    def __init__(self, subscription, chunk_size=1000):
+        self.subscription = subscription
+        self.chunk_size = chunk_size
+        self.search_backend = get_search_backend()
+        self.slug_allocator = SlugAllocator(Product)
+        # One instance for every row: building the fields is the costly part.
+        self.serializer = ProductImportSerializer()
+
+    def run(self, rows):
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+        rows = enumerate(rows, start=1)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self.import_chunk(chunk)
+
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+        }
+
+    def add_error(self, row_number, errors):
+        self.failed += 1
+        if len(self.errors) < self.max_reported_errors:
+            self.errors.append({'row': row_number, 'errors': errors})
+
+    def import_chunk(self, chunk):
+        valid = []
+        for row_number, row in chunk:
+            if isinstance(row, RowError):
+                self.add_error(row_number, {'non_field_errors': [row.message]})
+                continue
+            try:
+                valid.append((row_number, self.serializer.run_validation(row)))
+            except serializers.ValidationError as exc:
+                self.add_error(row_number, exc.detail)
+
+        valid = self.check_categories(valid)
+        if not valid:
+            return
+
+        # Slugs are allocated optimistically; if a concurrent insert takes
+        # one of them the chunk is rolled back and allocated again.
+        for attempt in range(self.insert_attempts):
+            products = self.build_products(valid)
+            if not products:
+                return
+            # Rows rejected for their slug are reported once, not per attempt.
+            built = {product._row_number for product in products}
+            valid = [item for item in valid if item[0] in built]
+            try:
+                with transaction.atomic():
+                    Product.objects.bulk_create(products)
+                break
+            except IntegrityError as exc:
+                if attempt == self.insert_attempts - 1:
+                    for product in products:
+                        self.add_error(product._row_number, {'non_field_errors': [f'Database error: {exc}']})
+                    return
+
+        self.search_backend.index(products)
+        catalog_versions.bump(self.subscription.pk, PRODUCTS)
+        self.created += len(products)
+
+    def build_products(self, valid):
+        """Resolve slugs for the chunk with one query and build unsaved products."""
+        explicit = [data['slug'] for _, data in valid if data.get('slug')]
+        generated = [data['name'] for _, data in valid if not data.get('slug')]
+        taken = self.slug_allocator.taken(
+            explicit + [self.slug_allocator.base_slug(name) for name in generated],
+            subscription=self.subscription,
+        )
+
+        products = []
+        pending = []
+        seen = set()
+        for row_number, data in valid:
+            slug = data.get('slug')
+            if not slug:
+                pending.append((row_number, data))
+                continue
+            if slug in taken or slug in seen:
+                self.add_error(row_number, {'slug': ['This slug already exists.']})
+                continue
+            seen.add(slug)
+            products.append(self.build_product(row_number, data, slug))
+
+        taken |= seen
+        slugs = self.slug_allocator.allocate([data['name'] for _, data in pending], taken=taken)
+        for (row_number, data), slug in zip(pending, slugs):
+            products.append(self.build_product(row_number, data, slug))
+        return products
+
+    def build_product(self, row_number, data, slug):
+        product = Product(
+            id=uuid.uuid4(), subscription=self.subscription, **{**data, 'slug': slug}
+        )
+        product._row_number = row_number
+        return product
+
+    def check_categories(self, valid):
+        category_ids = {data['category_id'] for _, data in valid}
+        existing = set(
+            Category.objects.filter(
+                subscription=self.subscription, pk__in=category_ids
+            ).values_list('pk', flat=True)
+        )
+        kept = []
+        for row_number, data in valid:
+            if data['category_id'] in existing:
+                kept.append((row_number, data))
+            else:
+                self.add_error(row_number, {'category_id': ['Category not found.']})
+        return kept
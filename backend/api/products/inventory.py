@@ -0,0 +1,140 @@
+import uuid
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from .caching import PRODUCTS, catalog_versions
+from .models import Product, StockReservation
+from .sharding import return_to_shards, sharded_stock, take_from_shards
+
+
+class InsufficientStock(Exception):
+    def __init__(self, shortfalls):
+        super().__init__('Insufficient stock')
+        self.shortfalls = shortfalls
+
+
+def reserve_stock(subscription, items, hold_seconds=None):
+    """
+    Deduct stock for many products at once. `items` maps product id to
+    quantity. Each product is decremented with a conditional
+    `UPDATE ... SET stock = stock - n WHERE stock >= n`, so there is no
+    read-then-write window and no explicit row lock; all decrements share
+    one transaction and are rolled back together if any item falls short.
+
+    With `hold_seconds` the deduction is recorded as a hold that can be
+    released or committed later, and is released automatically once it
+    expires. Returns the hold id (None without a hold).
+    Raises InsufficientStock listing every item that could not be served.
+
+    Sharded products are decremented on their StockShard rows instead.
+    """
+    now = timezone.now()
+    sharded = _shard_counts(items, subscription=subscription)
+    hold_id = uuid.uuid4() if hold_seconds else None
+    try:
+        with transaction.atomic():
+            short = []
+            # A stable order keeps concurrent multi-item reservations from
+            # deadlocking on each other's rows.
+            for product_id, quantity in sorted(items.items()):
+                if product_id in sharded:
+                    # Scoped to the subscription by _shard_counts().
+                    updated = take_from_shards(product_id, sharded[product_id], quantity)
+                else:
+                    updated = Product.objects.filter(
+                        subscription=subscription, pk=product_id, stock__gte=quantity
+                    ).update(stock=F('stock') - quantity, updated_at=now)
+                if not updated:
+                    short.append(product_id)
+            if short:
+                raise InsufficientStock(short)
+
+            if hold_id:
+                expires_at = now + timezone.timedelta(seconds=hold_seconds)
+                StockReservation.objects.bulk_create([
+                    StockReservation(
+                        subscription=subscription,
+                        hold_id=hold_id,
+                        product_id=product_id,
+                        quantity=quantity,
+                        expires_at=expires_at,
+                    )
+                    for product_id, quantity in items.items()
+                ])
+            if len(sharded) < len(items):
+                catalog_versions.bump(subscription.pk, PRODUCTS)
+    except InsufficientStock as exc:
+        available = dict(
+            Product.objects.filter(subscription=subscription, pk__in=exc.shortfalls)
+            .values_list('pk', 'stock')
+        )
+        available.update(sharded_stock([pk for pk in exc.shortfalls if pk in sharded]))
+        raise InsufficientStock([
+            {
+                'product_id': product_id,
+                'requested': items[product_id],
+                'available': available.get(product_id, 0),
+            }
+            for product_id in exc.shortfalls
+        ])
+    return hold_id
+
+
+def release_reservations(reservations):
+    """
+    Return the stock of the given StockReservation queryset to its products
+    and delete the reservations. The quantities are added back with one
+    CASE-based UPDATE. Returns the number of reservations released.
+    """
+    with transaction.atomic():
+        # Locking the reservation rows makes a concurrent release or commit
+        # of the same hold wait, so stock is never returned twice.
+        rows = list(
+            reservations.select_for_update().values_list('pk', 'product_id', 'quantity', 'subscription_id')
+        )
+        if not rows:
+            return 0
+
+        totals = defaultdict(int)
+        for _, product_id, quantity, _ in rows:
+            totals[product_id] += quantity
+        sharded = _shard_counts(totals)
+        by_quantity = defaultdict(list)
+        for product_id, quantity in totals.items():
+            if product_id in sharded:
+                return_to_shards(product_id, sharded[product_id], quantity)
+            else:
+                by_quantity[quantity].append(product_id)
+
+        Product.objects.filter(pk__in=totals, stock_shard_count=0).update(
+            stock=F('stock') + Case(
+                *[When(pk__in=pks, then=Value(quantity)) for quantity, pks in by_quantity.items()],
+                default=Value(0),
+                output_field=IntegerField(),
+            ),
+            updated_at=timezone.now(),
+        )
+        StockReservation.objects.filter(pk__in=[row[0] for row in rows]).delete()
+        catalog_versions.bump({row[3] for row in rows}, PRODUCTS)
+    return len(rows)
+
+
+def _shard_counts(product_ids, **scope):
+    """Map each sharded product among `product_ids` to its shard count."""
+    return dict(
+        Product.objects.filter(pk__in=list(product_ids), stock_shard_count__gt=0, **scope)
+        .values_list('pk', 'stock_shard_count')
+    )
+
+
+def commit_reservations(reservations):
+    """Make the deductions of the given reservations final."""
+    return reservations.delete()[0]
+
+
+def release_expired_reservations(now=None):
+    now = now or timezone.now()
+    return release_reservations(StockReservation.objects.filter(expires_at__lte=now))
@@ -1,9 +1,10 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from subscriptions.models import Subscription
 from mptt.models import MPTTModel, TreeForeignKey
 from django.core.validators import MinValueValidator
-from django.utils.text import slugify
-from api.utils import generate_unique_slug
+from django.utils import timezone
+from api.utils import SlugAllocator
+from .caching import PRODUCTS, catalog_versions
 import uuid
 
 class Category(MPTTModel):
@@ -24,17 +25,74 @@ class Category(MPTTModel):
         related_name='children',
         db_index=True
     )
+    path_names = models.JSONField(
+        default=list,
+        editable=False,
+        help_text="Names from the root down to this category, for breadcrumbs"
+    )
+    path_ids = models.JSONField(
+        default=list,
+        editable=False,
+        help_text="Ids from the root down to this category, matching path_names"
+    )
 
-    class MPTTModel:
+    class MPTTMeta:
         order_insertion_by = ['name']
 
     class Meta:
         unique_together = ('subscription', 'parent', 'name')
+        indexes = [
+            # Subtree lookups are lft/rght ranges within a tree.
+            models.Index(fields=['tree_id', 'lft', 'rght'], name='api_category_tree_range_idx'),
+        ]
         verbose_name_plural = 'Categories'
 
     def __str__(self):
         return self.name
 
+    def build_path(self):
+        names, ids = [], []
+        if self.parent_id is not None:
+            # Read from the database; a cached parent instance may be stale.
+            names, ids = Category.objects.filter(pk=self.parent_id).values_list(
+                'path_names', 'path_ids'
+            ).get()
+        return names + [self.name], ids + [str(self.pk)]
+
+    def save(self, *args, **kwargs):
+        path_names, path_ids = self.build_path()
+        path_changed = (path_names, path_ids) != (self.path_names, self.path_ids)
+        self.path_names, self.path_ids = path_names, path_ids
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'path_names', 'path_ids'}
+
+        adding = self._state.adding
+        if not adding:
+            # Inserts and moves elsewhere shift tree_id/lft/rght in the
+            # database without touching this instance; MPTT reorders and
+            # moves the node by those bounds, so read the current ones.
+            self._mptt_refresh()
+        super().save(*args, **kwargs)
+        # Renamed or moved: the stored paths below are stale too.
+        if path_changed and not adding:
+            self.update_descendant_paths()
+
+    def update_descendant_paths(self):
+        """Rewrite the stored paths of all descendants with one read and one bulk update."""
+        self._mptt_refresh()
+        descendants = list(self.get_descendants().only('id', 'name', 'parent_id', 'path_names', 'path_ids'))
+        paths = {self.pk: (self.path_names, self.path_ids)}
+        # Tree order, so parents come before their children.
+        for node in descendants:
+            names, ids = paths[node.parent_id]
+            node.path_names, node.path_ids = names + [node.name], ids + [str(node.pk)]
+            paths[node.pk] = (node.path_names, node.path_ids)
+        Category.objects.bulk_update(descendants, ['path_names', 'path_ids'], batch_size=1000)
+
+    @property
+    def breadcrumb(self):
+        return [{'id': pk, 'name': name} for pk, name in zip(self.path_ids, self.path_names)]
+
 
 class Product(models.Model):
     id = models.UUIDField(
@@ -62,7 +120,6 @@ class Product(models.Model):
     )
     slug = models.SlugField(
         max_length=255,
-        unique=True,
         db_index=True,
         help_text="URL-friendly identifier for the product"
     )
@@ -85,11 +142,34 @@ class Product(models.Model):
         validators=[MinValueValidator(0.01)],
         help_text="Discounted price, if applicable"
     )
+    final_price = models.GeneratedField(
+        expression=models.Case(
+            models.When(discount_price__gt=0, then=models.F('discount_price')),
+            default=models.F('price'),
+        ),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        db_persist=True,
+        help_text="Price the customer pays: the discount price if set, else the price"
+    )
+    has_discount = models.GeneratedField(
+        expression=models.Case(
+            models.When(discount_price__lt=models.F('price'), then=models.Value(True)),
+            default=models.Value(False),
+        ),
+        output_field=models.BooleanField(),
+        db_persist=True,
+        help_text="Whether a discount price below the regular price is set"
+    )
     stock = models.PositiveIntegerField(
         default=0,
         validators=[MinValueValidator(0)],
         help_text="Current stock quantity"
     )
+    stock_shard_count = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Number of StockShard rows holding the stock; 0 keeps it in `stock`. "
+                  "When sharded, `stock` is a periodically refreshed total"
+    )
     is_active = models.BooleanField(
         default=True,
         help_text="Whether the product is available for purchase"
@@ -110,6 +190,15 @@ class Product(models.Model):
             models.Index(fields=['slug']),
             models.Index(fields=['is_active']),
             models.Index(fields=['price']),
+            # Keyset pagination walks these (see api/products/pagination.py).
+            models.Index(fields=['subscription', 'created_at', 'id']),
+            models.Index(fields=['subscription', 'price', 'id']),
+            models.Index(fields=['subscription', 'name', 'id']),
+            models.Index(fields=['subscription', 'final_price', 'id']),
+            # Listing filters (see api/products/filters.py).
+            models.Index(fields=['subscription', 'is_active', 'final_price']),
+            models.Index(fields=['subscription', 'category', 'is_active']),
+            models.Index(fields=['subscription', 'has_discount', 'final_price']),
         ]
         verbose_name = "Product"
         verbose_name_plural = "Products"
@@ -117,10 +206,29 @@ class Product(models.Model):
     def __str__(self):
         return self.name
 
+    # Slugs are unique per subscription (see Meta.unique_together).
+    SLUG_ATTEMPTS = 3
+
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = generate_unique_slug(self, self.name, Product)
-        super().save(*args, **kwargs)
+        if self.slug:
+            return super().save(*args, **kwargs)
+
+        # Optimistic: allocate, insert, and allocate again if a concurrent
+        # insert took the slug in the meantime.
+        allocator = SlugAllocator(Product)
+        for attempt in range(self.SLUG_ATTEMPTS):
+            self.slug = allocator.allocate_one(self.name, subscription_id=self.subscription_id)
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                slug_taken = Product.objects.filter(
+                    subscription_id=self.subscription_id, slug=self.slug
+                ).exclude(pk=self.pk).exists()
+                # Out of attempts (or another constraint failed): raise,
+                # never fall through to saving without a slug.
+                if not slug_taken or attempt == self.SLUG_ATTEMPTS - 1:
+                    raise
 
     def get_final_price(self):
         return self.discount_price if self.discount_price and self.discount_price > 0 else self.price
@@ -131,11 +239,83 @@ class Product(models.Model):
     def reduce_stock(self, quantity):
         if quantity < 0:
             raise ValueError("Quantity cannot be negative")
-        if quantity > self.stock:
+        if self.stock_shard_count:
+            from .sharding import take_from_shards
+            if not take_from_shards(self.pk, self.stock_shard_count, quantity):
+                raise ValueError("Insufficient stock")
+            self.stock = max(self.stock - quantity, 0)
+            return
+        # Checked and applied by the database in one statement, so
+        # concurrent calls can't oversell.
+        updated = Product.objects.filter(pk=self.pk, stock__gte=quantity).update(
+            stock=models.F('stock') - quantity,
+            updated_at=timezone.now(),
+        )
+        if not updated:
             raise ValueError("Insufficient stock")
-        self.stock -= quantity
-        self.save()
+        catalog_versions.bump(self.subscription_id, PRODUCTS)
+        self.refresh_from_db(fields=['stock', 'updated_at'])
 
-    @property
-    def has_discount(self):
-        return self.discount_price is not None and self.discount_price < self.price
+
+class StockShard(models.Model):
+    """
+    One slice of a sharded product's stock. Decrements are spread over the
+    shards so concurrent buyers of a hot product don't all wait on one row
+    (see api/products/sharding.py).
+    """
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False,
+        unique=True
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='stock_shards'
+    )
+    index = models.PositiveSmallIntegerField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['product', 'index']
+
+    def __str__(self):
+        return f"{self.product_id}[{self.index}]: {self.count}"
+
+
+class StockReservation(models.Model):
+    """
+    Stock held for a pending checkout. The stock is already deducted from
+    the product; releasing the hold (or letting it expire) puts it back,
+    committing it makes the deduction final.
+    """
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False,
+        unique=True
+    )
+    subscription = models.ForeignKey(
+        Subscription,
+        on_delete=models.CASCADE,
+        related_name='stock_reservations'
+    )
+    hold_id = models.UUIDField(
+        db_index=True,
+        help_text="Groups the items reserved together in one request"
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='reservations'
+    )
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField(
+        db_index=True,
+        help_text="When the hold is released automatically"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} (hold {self.hold_id})"
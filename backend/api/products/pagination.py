@@ -0,0 +1,135 @@
+import base64
+import json
+import uuid
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on (<ordering field>, id). Each page is fetched with a
+    range condition on the last row seen instead of an OFFSET, so deep pages
+    cost the same as the first one when backed by an index on
+    (subscription, <field>, id).
+
+    Pages may be model instances or named `values_list()` rows, as long as
+    they carry the ordering field and the primary key.
+    """
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    ordering_param = 'ordering'
+    ordering_fields = ('created_at', 'price', 'final_price', 'name')
+    default_ordering = '-created_at'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.field, self.descending = self.get_ordering(request)
+        self.page_size = self.get_page_size(request)
+        self.pk_name = queryset.model._meta.pk.attname
+        model_field = queryset.model._meta.get_field(self.field)
+        # Generated columns convert values like their output field.
+        model_field = getattr(model_field, 'output_field', model_field)
+
+        cursor = self.decode_cursor(request, model_field)
+        reverse = cursor is not None and cursor['reverse']
+        # Walking backwards is a forward walk in the opposite direction.
+        descending = self.descending != reverse
+
+        if cursor is not None:
+            lookup = 'lt' if descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{lookup}': cursor['value']})
+                | Q(**{self.field: cursor['value'], f'pk__{lookup}': cursor['pk']})
+            )
+
+        prefix = '-' if descending else ''
+        rows = list(queryset.order_by(f'{prefix}{self.field}', f'{prefix}pk')[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        if reverse:
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.page = rows
+        return rows
+
+    def get_ordering(self, request):
+        ordering = request.query_params.get(self.ordering_param, self.default_ordering)
+        field = ordering.lstrip('-')
+        if field not in self.ordering_fields:
+            raise ValidationError({
+                self.ordering_param: f"Must be one of: {', '.join(self.ordering_fields)} (prefix with '-' for descending)."
+            })
+        return field, ordering.startswith('-')
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def decode_cursor(self, request, model_field):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            field, value, pk, reverse = payload
+            if field != self.field:
+                raise ValueError
+            return {
+                'value': model_field.to_python(value),
+                'pk': uuid.UUID(pk),
+                'reverse': bool(reverse),
+            }
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row, reverse):
+        value = getattr(row, self.field)
+        value = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        payload = json.dumps([self.field, value, str(getattr(row, self.pk_name)), int(reverse)])
+        encoded = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
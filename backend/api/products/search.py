@@ -0,0 +1,139 @@
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import BooleanField, Case, FloatField, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+
+class BaseSearchBackend:
+    """Full-text search over Product name and description, scoped per tenant."""
+
+    def index(self, products):
+        """Add or refresh `products` in the index."""
+
+    def remove(self, pks):
+        """Drop the products with these primary keys from the index."""
+
+    def search(self, queryset, subscription, query, limit):
+        """
+        Return up to `limit` rows of `queryset` belonging to `subscription`
+        that match `query`, best match first.
+        """
+        raise NotImplementedError
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    Uses the `search_vector` tsvector column added by migration 0005. It is a
+    generated column, so Postgres keeps it current on every write and
+    index()/remove() have nothing to do. Matching goes through its GIN index.
+    """
+    config = 'english'
+
+    def search(self, queryset, subscription, query, limit):
+        table = queryset.model._meta.db_table
+        tsquery = 'websearch_to_tsquery(%s::regconfig, %s)'
+        params = (self.config, query)
+        return queryset.filter(subscription=subscription).alias(
+            search_match=RawSQL(
+                f'"{table}"."search_vector" @@ {tsquery}', params, output_field=BooleanField()
+            ),
+        ).filter(search_match=True).annotate(
+            search_rank=RawSQL(
+                f'ts_rank("{table}"."search_vector", {tsquery})', params, output_field=FloatField()
+            ),
+        ).order_by('-search_rank', 'pk')[:limit]
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """
+    FTS5 virtual table for local development and tests, created by migration
+    0005. Rows are keyed by a rowid derived from the product UUID so updates
+    and deletes don't scan the table; it is kept current by the signal
+    handlers in api.products.signals and by the bulk write paths.
+    """
+    table = 'api_product_fts'
+
+    @staticmethod
+    def _rowid(pk):
+        return pk.int >> 65
+
+    def index(self, products):
+        rows = [
+            (self._rowid(p.pk), p.pk.hex, p.subscription_id.hex, p.name, p.description or '')
+            for p in products
+        ]
+        if not rows:
+            return
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(r[0],) for r in rows])
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, product_id, subscription_id, name, description) '
+                'VALUES (%s, %s, %s, %s, %s)',
+                rows,
+            )
+
+    def remove(self, pks):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(self._rowid(pk),) for pk in pks])
+
+    def search(self, queryset, subscription, query, limit):
+        terms = re.findall(r'\w+', query)
+        if not terms:
+            return queryset.none()
+        match = ' '.join('"%s"*' % term for term in terms)
+
+        sql = (
+            f'SELECT product_id FROM {self.table}'
+            f' WHERE {self.table} MATCH %s AND subscription_id = %s'
+            # name matches weigh more than description matches
+            f' ORDER BY bm25({self.table}, 0, 0, 10.0, 1.0) LIMIT %s'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [match, subscription.pk.hex, limit])
+            ids = [row[0] for row in cursor.fetchall()]
+
+        if not ids:
+            return queryset.none()
+        ranking = Case(
+            *[When(pk=pk, then=position) for position, pk in enumerate(ids)],
+            output_field=IntegerField(),
+        )
+        return queryset.filter(subscription=subscription, pk__in=ids).order_by(ranking)
+
+
+class BasicSearchBackend(BaseSearchBackend):
+    """
+    Fallback for databases without a dedicated backend: every term must
+    appear in the name or description (case-insensitive), name matches
+    first. No index is used, so it only suits small catalogs.
+    """
+
+    def search(self, queryset, subscription, query, limit):
+        terms = re.findall(r'\w+', query)
+        if not terms:
+            return queryset.none()
+        queryset = queryset.filter(subscription=subscription)
+        for term in terms:
+            queryset = queryset.filter(Q(name__icontains=term) | Q(description__icontains=term))
+        name_match = Case(
+            When(name__icontains=terms[0], then=Value(0)),
+            default=Value(1),
+            output_field=IntegerField(),
+        )
+        return queryset.order_by(name_match, 'name', 'pk')[:limit]
+
+
+_backends = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SQLiteSearchBackend,
+}
+
+
+def get_search_backend():
+    path = getattr(settings, 'PRODUCT_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    return _backends.get(connection.vendor, BasicSearchBackend)()
@@ -6,21 +6,47 @@ from .models import (
 )
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """
+    Accepts a `fields` argument listing the fields to keep; the others are
+    dropped before serialization. Views pass the result of
+    api.products.fieldsets.requested_fields() for ?fields= / ?omit=.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class CategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    breadcrumb = serializers.ReadOnlyField()
     children = serializers.SerializerMethodField()
 
     class Meta:
         model = Category
-        fields = ['id', 'name', 'parent', 'children']
+        fields = ['id', 'name', 'parent', 'breadcrumb', 'children']
 
     def get_children(self, obj):
-        # Get only direct children
-        if obj.get_children():
-            return CategorySerializer(obj.get_children(), many=True).data
-        return []
+        # Get only direct children; leaf nodes are answered without a query.
+        # Listings pass a prebuilt `category_children` map instead.
+        if 'category_children' in self.context:
+            children = self.context['category_children'].get(obj.pk, [])
+        else:
+            children = obj.get_children()
+        return CategorySerializer(children, many=True, context=self.context).data
+
+
+class CategorySummarySerializer(serializers.ModelSerializer):
+    breadcrumb = serializers.ReadOnlyField()
+
+    class Meta:
+        model = Category
+        fields = ['id', 'name', 'breadcrumb']
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     final_price = serializers.SerializerMethodField()
     has_discount = serializers.ReadOnlyField()
     is_in_stock = serializers.SerializerMethodField()
@@ -63,3 +89,30 @@ class ProductSerializer(serializers.ModelSerializer):
     def get_is_in_stock(self, obj):
         return obj.is_in_stock()
 
+
+class ProductListSerializer(ProductSerializer):
+    """Product listing with the category as `{id, name}` instead of its subtree."""
+    category = CategorySummarySerializer(read_only=True)
+
+
+class ReservationItemSerializer(serializers.Serializer):
+    product_id = serializers.UUIDField()
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class StockReservationSerializer(serializers.Serializer):
+    items = ReservationItemSerializer(many=True, allow_empty=False)
+    hold_seconds = serializers.IntegerField(
+        min_value=1, max_value=24 * 60 * 60, required=False, allow_null=True
+    )
+
+    def validate_items(self, items):
+        # Merge repeated products into a single quantity.
+        merged = {}
+        for item in items:
+            merged[item['product_id']] = merged.get(item['product_id'], 0) + item['quantity']
+        return merged
+
+
+class HoldIdsSerializer(serializers.Serializer):
+    hold_ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False)
@@ -0,0 +1,136 @@
+import random
+
+from django.db import transaction
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .caching import PRODUCTS, catalog_versions
+from .models import Product, StockShard
+
+
+def split_stock(total, shard_count):
+    """Spread `total` as evenly as possible over `shard_count` shards."""
+    share, extra = divmod(total, shard_count)
+    return [share + (1 if index < extra else 0) for index in range(shard_count)]
+
+
+def take_from_shards(product_id, shard_count, quantity):
+    """
+    Deduct `quantity` from a sharded product; returns False if it doesn't
+    have that much stock. Starts at a random shard and uses the same
+    conditional UPDATE as unsharded stock, so concurrent callers mostly hit
+    different rows. Only when no single shard can cover the quantity are all
+    shards locked and drained greedily.
+    """
+    start = random.randrange(shard_count)
+    for offset in range(shard_count):
+        index = (start + offset) % shard_count
+        updated = StockShard.objects.filter(
+            product_id=product_id, index=index, count__gte=quantity
+        ).update(count=F('count') - quantity)
+        if updated:
+            return True
+
+    with transaction.atomic():
+        shards = list(
+            StockShard.objects.select_for_update()
+            .filter(product_id=product_id).order_by('index')
+        )
+        if sum(shard.count for shard in shards) < quantity:
+            return False
+        remaining = quantity
+        for shard in sorted(shards, key=lambda shard: -shard.count):
+            used = min(shard.count, remaining)
+            shard.count -= used
+            remaining -= used
+            if not remaining:
+                break
+        StockShard.objects.bulk_update(shards, ['count'])
+    return True
+
+
+def return_to_shards(product_id, shard_count, quantity):
+    """Add `quantity` back to a random shard."""
+    StockShard.objects.filter(
+        product_id=product_id, index=random.randrange(shard_count)
+    ).update(count=F('count') + quantity)
+
+
+def sharded_stock(product_ids):
+    """Current total stock per sharded product, summed from the shards."""
+    return dict(
+        StockShard.objects.filter(product_id__in=product_ids)
+        .values('product_id').annotate(total=Sum('count'))
+        .values_list('product_id', 'total')
+    )
+
+
+def set_sharded_stock(product_id, shard_count, total):
+    """Replace the stock of a sharded product, spread evenly over its shards."""
+    with transaction.atomic():
+        shards = list(
+            StockShard.objects.select_for_update()
+            .filter(product_id=product_id).order_by('index')
+        )
+        for shard, count in zip(shards, split_stock(total, shard_count)):
+            shard.count = count
+        StockShard.objects.bulk_update(shards, ['count'])
+
+
+def reshard(product_id, shard_count):
+    """
+    Move a product's stock onto `shard_count` evenly filled shards, or back
+    into `Product.stock` when `shard_count` is 0. Also used to rebalance a
+    product that keeps its shard count. Returns the product's total stock.
+    """
+    with transaction.atomic():
+        product = Product.objects.select_for_update().only(
+            'subscription_id', 'stock', 'stock_shard_count'
+        ).get(pk=product_id)
+        shards = list(StockShard.objects.select_for_update().filter(product_id=product_id))
+        total = sum(shard.count for shard in shards) if product.stock_shard_count else product.stock
+
+        if shard_count and len(shards) == shard_count:
+            counts = split_stock(total, shard_count)
+            for shard in shards:
+                shard.count = counts[shard.index]
+            StockShard.objects.bulk_update(shards, ['count'])
+        else:
+            StockShard.objects.filter(product_id=product_id).delete()
+            if shard_count:
+                StockShard.objects.bulk_create([
+                    StockShard(product_id=product_id, index=index, count=count)
+                    for index, count in enumerate(split_stock(total, shard_count))
+                ])
+
+        Product.objects.filter(pk=product_id).update(stock=total, stock_shard_count=shard_count)
+        catalog_versions.bump(product.subscription_id, PRODUCTS)
+    return total
+
+
+def refresh_sharded_stock(queryset=None):
+    """
+    Store the shard totals in `Product.stock` for the sharded products in
+    `queryset` whose stored total is out of date, with one UPDATE. Returns
+    the number of products refreshed; only their subscriptions' catalog
+    versions are bumped.
+    """
+    queryset = Product.objects.all() if queryset is None else queryset
+    total = StockShard.objects.filter(product=OuterRef('pk')).values('product').annotate(
+        total=Sum('count')
+    ).values('total')
+    shard_total = Coalesce(Subquery(total, output_field=IntegerField()), Value(0))
+
+    with transaction.atomic():
+        stale = dict(
+            queryset.filter(stock_shard_count__gt=0)
+            .annotate(shard_total=shard_total)
+            .exclude(stock=F('shard_total'))
+            .values_list('pk', 'subscription_id')
+        )
+        if not stale:
+            return 0
+        updated = Product.objects.filter(pk__in=stale).update(stock=shard_total)
+        # After the write, so the on_commit bump can't precede it.
+        catalog_versions.bump(set(stale.values()), PRODUCTS)
+    return updated
@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import CATEGORIES, PRODUCTS, catalog_versions
+from .models import Category, Product
+from .search import get_search_backend
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    get_search_backend().index([instance])
+    catalog_versions.bump(instance.subscription_id, PRODUCTS)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    get_search_backend().remove([instance.pk])
+    catalog_versions.bump(instance.subscription_id, PRODUCTS)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_category_version(sender, instance, **kwargs):
+    catalog_versions.bump(instance.subscription_id, CATEGORIES)
@@ -0,0 +1,227 @@
+import uuid
+from bisect import bisect_right
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from api.parsers import RowError
+from .caching import CATEGORIES, catalog_versions
+from .models import Category
+
+NAME_MAX_LENGTH = Category._meta.get_field('name').max_length
+
+
+def paths_from_tree(nodes):
+    """
+    Yield (location, path) for every node of nested `{"name", "children"}`
+    JSON, parents before children. `location` identifies the node in error
+    reports; an invalid node is yielded as a RowError instead of a path.
+    """
+    stack = [((index,), (), node) for index, node in reversed(list(enumerate(nodes)))]
+    while stack:
+        location, parent_path, node = stack.pop()
+        label = '/'.join(str(index) for index in location)
+        if not isinstance(node, dict) or not isinstance(node.get('name'), str):
+            yield label, RowError('Expected an object with a "name".')
+            continue
+        children = node.get('children') or []
+        if not isinstance(children, list):
+            yield label, RowError('"children" must be a list.')
+            continue
+        path = parent_path + (node['name'],)
+        yield label, path
+        stack.extend(
+            (location + (index,), path, child) for index, child in reversed(list(enumerate(children)))
+        )
+
+
+def paths_from_rows(rows, separator='>'):
+    """Yield (row number, path) for `{"path": "A > B > C"}` rows, e.g. from CSV."""
+    for number, row in enumerate(rows, start=1):
+        if isinstance(row, RowError):
+            yield number, row
+        elif not isinstance(row, dict) or not isinstance(row.get('path'), str):
+            yield number, RowError('Expected a "path" column.')
+        else:
+            yield number, tuple(row['path'].split(separator))
+
+
+class CategoryImporter:
+    """
+    Imports a taxonomy given as category paths, creating the categories
+    that don't exist yet (existing ones are matched by parent and name).
+
+    Inserting nodes one by one makes django-mptt renumber lft/rght across
+    the tree for every insert. Instead, the tenant's categories are loaded
+    once, new nodes are added in memory and every touched tree is numbered
+    in a single pass, children ordered by name as `order_insertion_by`
+    would. New roots get the tree ids django-mptt would give them, which
+    keeps roots ordered by name (later trees move up with one UPDATE). New
+    nodes are written with bulk_create and renumbered ones with bulk_update,
+    in one transaction.
+    """
+    batch_size = 1000
+    max_reported_errors = 1000
+
+    def __init__(self, subscription):
+        self.subscription = subscription
+
+    def run(self, paths):
+        self.errors = []
+        self.failed = 0
+
+        with transaction.atomic(), Category.objects.disable_mptt_updates():
+            self.lock_table()
+            # Locked so concurrent imports or inserts can't interleave.
+            categories = list(
+                Category.objects.select_for_update()
+                .filter(subscription=self.subscription)
+                .only('id', 'name', 'parent_id', 'tree_id', 'lft', 'rght', 'level', 'path_names', 'path_ids')
+            )
+            children = defaultdict(list)
+            by_key = {}
+            for category in categories:
+                children[category.parent_id].append(category)
+                by_key[(category.parent_id, category.name)] = category
+
+            created = []
+            touched_roots = {}
+            for location, path in paths:
+                names = self.clean_path(location, path)
+                if names is None:
+                    continue
+                parent, root = None, None
+                for name in names:
+                    key = (parent.pk if parent else None, name)
+                    node = by_key.get(key)
+                    if node is None:
+                        node = Category(
+                            id=uuid.uuid4(),
+                            subscription=self.subscription,
+                            name=name,
+                            parent_id=key[0],
+                        )
+                        node.path_names = (parent.path_names if parent else []) + [name]
+                        node.path_ids = (parent.path_ids if parent else []) + [str(node.pk)]
+                        by_key[key] = node
+                        children[key[0]].append(node)
+                        created.append(node)
+                        touched_roots[(root or node).pk] = root or node
+                    parent = node
+                    root = root or node
+
+            self.place_roots([node for node in created if node.parent_id is None], categories)
+            changed = self.renumber(list(touched_roots.values()), children)
+            Category.objects.bulk_create(created, batch_size=self.batch_size)
+            Category.objects.bulk_update(changed, ['lft', 'rght', 'level'], batch_size=self.batch_size)
+            if created:
+                catalog_versions.bump(self.subscription.pk, CATEGORIES)
+
+        return {
+            'created': len(created),
+            'failed': self.failed,
+            'errors': self.errors,
+        }
+
+    def clean_path(self, location, path):
+        if isinstance(path, RowError):
+            return self.add_error(location, path.message)
+        names = [name.strip() for name in path]
+        if not names or not all(names):
+            return self.add_error(location, 'Category names may not be blank.')
+        if any(len(name) > NAME_MAX_LENGTH for name in names):
+            return self.add_error(location, f'Category names are limited to {NAME_MAX_LENGTH} characters.')
+        return names
+
+    def add_error(self, location, message):
+        self.failed += 1
+        if len(self.errors) < self.max_reported_errors:
+            self.errors.append({'row': location, 'errors': {'non_field_errors': [message]}})
+        return None
+
+    def lock_table(self):
+        """
+        New roots shift the tree ids of every tenant's trees (see
+        place_roots), which the row locks on this tenant's categories don't
+        cover. On PostgreSQL, block other writers to the table until the
+        import commits; reads go on. Taken before any row lock, so two
+        imports queue up instead of deadlocking. SQLite already allows a
+        single writer.
+        """
+        if connection.vendor != 'postgresql':
+            return
+        table = connection.ops.quote_name(Category._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE')
+
+    def place_roots(self, new_roots, loaded):
+        """
+        Set the tree ids of `new_roots` where django-mptt's order_insertion_by
+        would insert them: before the first root (of any tenant) with a
+        greater name, or after the last tree. Trees from there on move up by
+        the number of roots inserted before them, with one UPDATE; `loaded`
+        categories get their new tree ids too.
+        """
+        if not new_roots:
+            return
+        existing = sorted(Category.objects.filter(parent=None).values_list('name', 'tree_id'))
+        names = [name for name, _ in existing]
+        last_tree_id = max((tree_id for _, tree_id in existing), default=0)
+
+        # insertion point (tree id of the right sibling, None for the end) -> roots
+        inserted = defaultdict(list)
+        for root in sorted(new_roots, key=lambda node: node.name):
+            index = bisect_right(names, root.name)
+            inserted[existing[index][1] if index < len(existing) else None].append(root)
+
+        points = sorted(point for point in inserted if point is not None)
+        before = 0
+        shifts = []
+        for point in points:
+            for offset, root in enumerate(inserted[point]):
+                root.tree_id = point + before + offset
+            before += len(inserted[point])
+            shifts.append((point, before))
+        for offset, root in enumerate(inserted[None]):
+            root.tree_id = last_tree_id + before + offset + 1
+
+        if not shifts:
+            return
+        Category.objects.filter(tree_id__gte=points[0]).update(tree_id=F('tree_id') + Case(
+            *[When(tree_id__gte=point, then=Value(shift)) for point, shift in reversed(shifts)],
+            output_field=IntegerField(),
+        ))
+        for category in loaded:
+            for point, shift in reversed(shifts):
+                if category.tree_id >= point:
+                    category.tree_id += shift
+                    break
+
+    def renumber(self, roots, children):
+        """
+        Assign tree_id/lft/rght/level to every node under `roots`, whose
+        tree ids are set. Returns the existing nodes whose values changed.
+        """
+        changed = []
+        for root in sorted(roots, key=lambda node: node.name):
+            counter = 1
+            old = {}
+            # (node, level, whether its children are done)
+            stack = [(root, 0, False)]
+            while stack:
+                node, level, closing = stack.pop()
+                if closing:
+                    node.rght = counter
+                    counter += 1
+                    if node.pk in old and old[node.pk] != (node.lft, node.rght, node.level):
+                        changed.append(node)
+                    continue
+                if not node._state.adding:
+                    old[node.pk] = (node.lft, node.rght, node.level)
+                node.tree_id, node.lft, node.level = root.tree_id, counter, level
+                counter += 1
+                stack.append((node, level, True))
+                for child in sorted(children[node.pk], key=lambda child: child.name, reverse=True):
+                    stack.append((child, level + 1, False))
+        return changed
@@ -0,0 +1,114 @@
+import uuid
+from collections import defaultdict
+
+from django.db.models import Count, Subquery
+
+from .fast_serializers import breadcrumb
+from .models import Category, Product
+
+
+def category_tree_queryset(subscription, root=None, depth=None):
+    """
+    All categories of a tenant (or the subtree under `root`) in tree order,
+    as a single query. `depth` limits how many levels below the top are
+    included; 0 returns only the top level.
+    """
+    queryset = Category.objects.filter(subscription=subscription)
+
+    if root is not None:
+        root_node = Category.objects.filter(subscription=subscription, pk=root)
+        queryset = queryset.filter(
+            tree_id=Subquery(root_node.values('tree_id')),
+            lft__gte=Subquery(root_node.values('lft')),
+            rght__lte=Subquery(root_node.values('rght')),
+        )
+        if depth is not None:
+            queryset = queryset.filter(level__lte=Subquery(root_node.values('level')) + depth)
+    elif depth is not None:
+        queryset = queryset.filter(level__lte=depth)
+
+    return queryset.order_by('tree_id', 'lft')
+
+
+TREE_FIELDS = ('id', 'name', 'parent', 'breadcrumb', 'product_count', 'total_product_count')
+
+
+def count_active_products(subscription, root=None):
+    """
+    ({category id: active products directly in it}, {category id: active
+    products in its whole subtree}) for a tenant, or for the subtree under
+    `root`. One grouped query gives the direct counts; each is then added
+    to every category on its stored path, so categories cut off by a
+    `depth` limit still count towards their ancestors.
+    """
+    products = Product.objects.filter(subscription=subscription, is_active=True)
+    if root is not None:
+        products = products.filter(category__in=category_tree_queryset(subscription, root).values('pk'))
+
+    direct = {}
+    total = defaultdict(int)
+    rows = products.order_by().values_list('category_id', 'category__path_ids').annotate(count=Count('pk'))
+    for category_id, path_ids, count in rows:
+        direct[category_id] = count
+        for pk in path_ids:
+            total[uuid.UUID(pk)] += count
+    return direct, total
+
+
+def build_category_tree(rows, fields=TREE_FIELDS, direct=None, total=None):
+    """
+    Nest (id, parent_id, name, path_ids, path_names) rows, ordered by
+    tree_id/lft, into nodes with the given `fields` (a subset of
+    TREE_FIELDS, in that order) and `children`. The counts are read from
+    the `direct` and `total` maps of count_active_products(). With all
+    fields this is CategorySerializer's shape plus the two counts, except
+    that only top-level nodes carry a `breadcrumb`: below them the nesting
+    already gives it. Rows whose parent is not part of the result (such as
+    a `root` subtree's top) become top-level nodes, and their breadcrumb
+    still starts at the tenant's root category.
+    """
+    direct = direct or {}
+    total = total or {}
+    nodes = {}
+    roots = []
+    for pk, parent_id, name, path_ids, path_names in rows:
+        parent = nodes.get(parent_id)
+        data = {
+            'id': pk,
+            'name': name,
+            'parent': parent_id,
+            'breadcrumb': breadcrumb(path_ids, path_names) if parent is None else None,
+            'product_count': direct.get(pk, 0),
+            'total_product_count': total.get(pk, 0),
+        }
+        node = {field: data[field] for field in fields if parent is None or field != 'breadcrumb'}
+        node['children'] = []
+        nodes[pk] = node
+        if parent is None:
+            roots.append(node)
+        else:
+            parent['children'].append(node)
+    return roots
+
+
+def category_children_map(subscription):
+    """
+    {parent_id: [Category, ...]} for a whole tenant in one query. Passed to
+    CategorySerializer as the `category_children` context entry so nested
+    category output doesn't query per node.
+    """
+    children = defaultdict(list)
+    for category in category_tree_queryset(subscription):
+        children[category.parent_id].append(category)
+    return children
+
+
+def get_category_tree(subscription, root=None, depth=None, fields=TREE_FIELDS):
+    """The nested tree with just `fields`; counts not asked for aren't computed."""
+    direct = total = None
+    if 'product_count' in fields or 'total_product_count' in fields:
+        direct, total = count_active_products(subscription, root)
+    rows = category_tree_queryset(subscription, root, depth).values_list(
+        'id', 'parent_id', 'name', 'path_ids', 'path_names'
+    )
+    return build_category_tree(rows, fields, direct, total)
@@ -1,10 +1,26 @@
 from django.urls import path
 from .views import (
+    CategoryImportView,
     CategoryListCreateView,
-    ProductListCreateView
+    ProductBulkUpdateView,
+    ProductExportView,
+    ProductImportView,
+    ProductListCreateView,
+    ProductSearchView,
+    StockReservationCommitView,
+    StockReservationReleaseView,
+    StockReservationView,
 )
 
 urlpatterns = [
     path('categories/', CategoryListCreateView.as_view(), name='category-list-create'),
+    path('categories/import/', CategoryImportView.as_view(), name='category-import'),
     path('products/', ProductListCreateView.as_view(), name='product-list-create'),
+    path('products/search/', ProductSearchView.as_view(), name='product-search'),
+    path('products/import/', ProductImportView.as_view(), name='product-import'),
+    path('products/export/', ProductExportView.as_view(), name='product-export'),
+    path('products/bulk/', ProductBulkUpdateView.as_view(), name='product-bulk-update'),
+    path('reservations/', StockReservationView.as_view(), name='stock-reservation'),
+    path('reservations/release/', StockReservationReleaseView.as_view(), name='stock-reservation-release'),
+    path('reservations/commit/', StockReservationCommitView.as_view(), name='stock-reservation-commit'),
 ]
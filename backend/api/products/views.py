@@ -1,38 +1,172 @@
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework import status
 
 from django.db import IntegrityError
+from django.http import StreamingHttpResponse
 
+import uuid
+
+from api.parsers import CSVParser, FastJSONParser, NDJSONParser
+from api.renderers import CSVRenderer, NDJSONRenderer
 from authentication.authentication import APIKeyAuthentication
 from subscriptions.permissions import HasValidSubscription
+from subscriptions.throttling import PlanRateThrottle
 from .models import (
     Category,
     Product,
+    StockReservation,
 )
 from .serializers import (
     CategorySerializer, 
-    ProductSerializer
+    HoldIdsSerializer,
+    ProductListSerializer,
+    ProductSerializer,
+    StockReservationSerializer,
+)
+from .bulk import ProductBulkUpdater
+from .caching import CATEGORIES, PRODUCTS, ConditionalGetMixin
+from .export import EXPORT_FIELDS, export_rows
+from .fast_serializers import ProductFastSerializer
+from .fieldsets import product_columns, requested_fields
+from .filters import ProductFilterBackend
+from .importer import ProductImporter
+from .inventory import (
+    InsufficientStock,
+    commit_reservations,
+    release_reservations,
+    reserve_stock,
 )
+from .pagination import KeysetPagination
+from .search import get_search_backend
+from .taxonomy import CategoryImporter, paths_from_rows, paths_from_tree
+from .tree import TREE_FIELDS, category_children_map, get_category_tree
 
-class CategoryListCreateView(generics.ListCreateAPIView):
+class CategoryListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     serializer_class = CategorySerializer
     permission_classes = [HasValidSubscription]
     authentication_classes = [APIKeyAuthentication]
+    throttle_classes = [PlanRateThrottle]
+    # The tree carries product counts.
+    catalog_kinds = (CATEGORIES, PRODUCTS)
 
     def get_queryset(self):
         return Category.objects.filter(subscription=self.request.subscription)
 
+    def list(self, request, *args, **kwargs):
+        # The whole tree is loaded in one ordered query and nested in memory.
+        root = request.query_params.get('root')
+        depth = request.query_params.get('depth')
+
+        if root is not None:
+            try:
+                root = uuid.UUID(root)
+            except ValueError:
+                raise ValidationError({'root': 'Must be a valid category id.'})
+        if depth is not None:
+            try:
+                depth = int(depth)
+            except ValueError:
+                depth = -1
+            if depth < 0:
+                raise ValidationError({'depth': 'Must be a non-negative integer.'})
+
+        # ?fields= / ?omit= prune the nodes; `children` is always kept.
+        fields = requested_fields(request, list(TREE_FIELDS)) or TREE_FIELDS
+        tree = get_category_tree(request.subscription, root, depth, fields)
+        # An existing root is always part of its own subtree.
+        if root is not None and not tree:
+            raise NotFound('No Category matches the given query.')
+        return Response(tree)
+
     def perform_create(self, serializer):
         serializer.save(subscription=self.request.subscription)
 
-class ProductListCreateView(generics.ListCreateAPIView):
+class CategoryImportView(APIView):
+    """
+    Bulk taxonomy import. Takes nested JSON, a list of
+    `{"name", "children": [...]}` objects, or CSV (text/csv) with a `path`
+    column such as `Electronics > Phones > Android` (`?separator=` changes
+    the `>`). Missing categories are created, existing ones are kept, and
+    each affected tree is renumbered once.
+    """
+    permission_classes = [HasValidSubscription]
+    authentication_classes = [APIKeyAuthentication]
+    throttle_classes = [PlanRateThrottle]
+    parser_classes = [FastJSONParser, CSVParser]
+
+    def post(self, request):
+        if request.content_type.startswith(CSVParser.media_type):
+            separator = request.query_params.get('separator') or '>'
+            paths = paths_from_rows(request.data, separator)
+        elif isinstance(request.data, list):
+            paths = paths_from_tree(request.data)
+        else:
+            raise ValidationError({'non_field_errors': ['Expected a list of categories.']})
+        return Response(CategoryImporter(request.subscription).run(paths))
+
+class ProductListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     serializer_class = ProductSerializer
     permission_classes = [HasValidSubscription]
     authentication_classes = [APIKeyAuthentication]
+    throttle_classes = [PlanRateThrottle]
+    pagination_class = KeysetPagination
+    filter_backends = [ProductFilterBackend]
+    # Listings embed category data too.
+    catalog_kinds = (PRODUCTS, CATEGORIES)
 
     def get_queryset(self):
-        return Product.objects.filter(subscription=self.request.subscription)
+        queryset = Product.objects.filter(subscription=self.request.subscription)
+        fields = self.get_fieldset()
+        if fields is None or 'category' in fields:
+            queryset = queryset.select_related('category')
+        return queryset
+
+    def get_fieldset(self):
+        """Output fields picked with ?fields= / ?omit= on listings; None for all."""
+        if self.request.method != 'GET':
+            return None
+        return requested_fields(self.request, ProductFastSerializer.field_names())
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_fieldset())
+        return super().get_serializer(*args, **kwargs)
+
+    def expand_category(self):
+        return 'category' in self.request.query_params.get('expand', '').split(',')
+
+    def get_serializer_class(self):
+        # Listings embed a compact category unless ?expand=category is given.
+        if self.request.method == 'GET' and not self.expand_category():
+            return ProductListSerializer
+        return ProductSerializer
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        fields = self.get_fieldset()
+        if self.request.method == 'GET' and self.expand_category() and (fields is None or 'category' in fields):
+            context['category_children'] = category_children_map(self.request.subscription)
+        return context
+
+    def list(self, request, *args, **kwargs):
+        fields = self.get_fieldset()
+        queryset = self.filter_queryset(self.get_queryset())
+        # Pages are ordered and cursored by this field, so it is always read.
+        ordering, _ = self.paginator.get_ordering(request)
+
+        if self.expand_category():
+            if fields is not None:
+                queryset = queryset.only(*product_columns(fields, ordering))
+            page = self.paginate_queryset(queryset)
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+        # Compact listings skip model instances and DRF fields entirely.
+        fast = ProductFastSerializer(fields)
+        page = self.paginate_queryset(fast.rows(queryset, extra=('id', ordering)))
+        return self.get_paginated_response(fast.serialize(page))
 
     def perform_create(self, serializer):
         try:
@@ -41,3 +175,149 @@ class ProductListCreateView(generics.ListCreateAPIView):
             if 'slug' in str(e):
                 raise ValidationError({'slug': 'This slug already exists. Please choose a different one.'})
             raise ValidationError('A database error occurred.')
+
+class ProductSearchView(generics.ListAPIView):
+    serializer_class = ProductListSerializer
+    permission_classes = [HasValidSubscription]
+    authentication_classes = [APIKeyAuthentication]
+    throttle_classes = [PlanRateThrottle]
+    default_limit = 20
+    max_limit = 100
+
+    def get_queryset(self):
+        query = self.request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': 'This parameter is required.'})
+
+        try:
+            limit = int(self.request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            raise ValidationError({'limit': 'Must be an integer.'})
+        limit = min(max(limit, 1), self.max_limit)
+
+        queryset = Product.objects.select_related('category')
+        return get_search_backend().search(queryset, self.request.subscription, query, limit)
+
+    def list(self, request, *args, **kwargs):
+        fast = ProductFastSerializer(requested_fields(request, ProductFastSerializer.field_names()))
+        return Response(fast.serialize(fast.rows(self.get_queryset())))
+
+class ProductImportView(APIView):
+    """
+    Bulk import from an NDJSON (application/x-ndjson) or CSV (text/csv)
+    request body. The body is streamed and imported in chunks; the response
+    lists the rows that were rejected.
+    """
+    permission_classes = [HasValidSubscription]
+    authentication_classes = [APIKeyAuthentication]
+    throttle_classes = [PlanRateThrottle]
+    parser_classes = [NDJSONParser, CSVParser]
+
+    def post(self, request):
+        result = ProductImporter(request.subscription).run(request.data)
+        return Response(result)
+
+class ProductExportView(generics.GenericAPIView):
+    """
+    Stream the whole catalog as NDJSON (default) or CSV, chosen with the
+    Accept header or `?format=ndjson|csv`. Accepts the listing filters.
+    Rows are read in chunks and written out as they come, so neither side
+    holds the full catalog in memory.
+    """
+    permission_classes = [HasValidSubscription]
+    authentication_classes = [APIKeyAuthentication]
+    throttle_classes = [PlanRateThrottle]
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+    filter_backends = [ProductFilterBackend]
+    chunk_size = 2000
+
+    def get_queryset(self):
+        return Product.objects.filter(subscription=self.request.subscription)
+
+    def get(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(export_rows(queryset, self.chunk_size), EXPORT_FIELDS),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}',
+        )
+        response['Content-Disposition'] = f'attachment; filename="products.{renderer.format}"'
+        return response
+
+class ProductBulkUpdateView(APIView):
+    """
+    PATCH a list of `{id|slug, price?, discount_price?, stock?, is_active?}`
+    objects. Valid entries are applied in one transaction; invalid or unknown
+    ones are reported by their index in the list.
+    """
+    permission_classes = [HasValidSubscription]
+    authentication_classes = [APIKeyAuthentication]
+    throttle_classes = [PlanRateThrottle]
+
+    def patch(self, request):
+        if not isinstance(request.data, list):
+            raise ValidationError({'non_field_errors': ['Expected a list of items.']})
+        result = ProductBulkUpdater(request.subscription).run(request.data)
+        return Response(result)
+
+class StockReservationView(APIView):
+    """
+    Deduct stock for several products atomically. With `hold_seconds` the
+    deduction is a hold that can be released or committed via its hold_id;
+    without it the deduction is final. Responds 409 with the shortfalls if
+    any item can't be served, in which case nothing is deducted.
+    """
+    permission_classes = [HasValidSubscription]
+    authentication_classes = [APIKeyAuthentication]
+    throttle_classes = [PlanRateThrottle]
+
+    def post(self, request):
+        serializer = StockReservationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data['items']
+        hold_seconds = serializer.validated_data.get('hold_seconds')
+
+        try:
+            hold_id = reserve_stock(request.subscription, items, hold_seconds)
+        except InsufficientStock as e:
+            return Response({'shortfalls': e.shortfalls}, status=status.HTTP_409_CONFLICT)
+
+        return Response({
+            'hold_id': hold_id,
+            'items': [
+                {'product_id': product_id, 'quantity': quantity}
+                for product_id, quantity in items.items()
+            ],
+        }, status=status.HTTP_201_CREATED)
+
+
+class StockReservationReleaseView(APIView):
+    """Release holds, returning their stock to the products."""
+    permission_classes = [HasValidSubscription]
+    authentication_classes = [APIKeyAuthentication]
+    throttle_classes = [PlanRateThrottle]
+
+    def post(self, request):
+        serializer = HoldIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        reservations = StockReservation.objects.filter(
+            subscription=request.subscription,
+            hold_id__in=serializer.validated_data['hold_ids'],
+        )
+        return Response({'released': release_reservations(reservations)})
+
+
+class StockReservationCommitView(APIView):
+    """Make held stock deductions final."""
+    permission_classes = [HasValidSubscription]
+    authentication_classes = [APIKeyAuthentication]
+    throttle_classes = [PlanRateThrottle]
+
+    def post(self, request):
+        serializer = HoldIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        reservations = StockReservation.objects.filter(
+            subscription=request.subscription,
+            hold_id__in=serializer.validated_data['hold_ids'],
+        )
+        return Response({'committed': commit_reservations(reservations)})
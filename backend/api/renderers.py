@@ -0,0 +1,149 @@
+import csv
+import datetime
+import io
+import json
+from decimal import Decimal
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer using orjson when it is installed. Output is identical to
+    JSONRenderer's: datetimes, Decimals and other types orjson would format
+    differently go through DRF's encoder, and \\u2028/\\u2029 are escaped
+    the same way. Indented output (e.g. for the browsable API), non-default
+    JSON settings and anything orjson rejects fall back to JSONRenderer.
+
+    Native floats are written by orjson, which spells exponents differently
+    (1e16 vs 1e+16) and writes NaN as null; the API only emits prices as
+    Decimals, which are checked.
+    """
+    options = (
+        orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if orjson is not None else 0
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or not self.strict
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        encoder = self.encoder_class()
+
+        def default(obj):
+            if isinstance(obj, Decimal):
+                value = float(obj)
+                # Outside this range repr() and orjson disagree on the notation.
+                if value and not 1e-4 <= abs(value) < 1e16:
+                    raise TypeError
+                return value
+            return encoder.default(obj)
+
+        try:
+            ret = orjson.dumps(data, default=default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class RowJSONEncoder(DjangoJSONEncoder):
+    """
+    DjangoJSONEncoder writing datetimes and times with the full isoformat(),
+    microseconds included, as CSVRenderer does for the same values.
+    """
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class RowStreamRenderer(BaseRenderer):
+    """
+    Base for line-oriented formats. stream() encodes an iterable of dicts
+    chunk by chunk, for use with a StreamingHttpResponse; render() covers
+    ordinary responses (such as errors) with the same format.
+    """
+    charset = 'utf-8'
+    rows_per_chunk = 500
+
+    def stream(self, rows, fields):
+        """Yield the encoded output for `rows`, a few hundred rows per bytes chunk."""
+        header = self.encode_header(fields)
+        if header:
+            yield header.encode(self.charset)
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.rows_per_chunk))
+            if not chunk:
+                return
+            yield self.encode_rows(chunk, fields).encode(self.charset)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        fields = list(dict.fromkeys(key for row in rows for key in row))
+        return b''.join(self.stream(rows, fields))
+
+    def encode_header(self, fields):
+        return ''
+
+    def encode_rows(self, rows, fields):
+        raise NotImplementedError
+
+
+class NDJSONRenderer(RowStreamRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def encode_rows(self, rows, fields):
+        return ''.join(
+            json.dumps(row, cls=RowJSONEncoder, ensure_ascii=False) + '\n'
+            for row in rows
+        )
+
+
+class CSVRenderer(RowStreamRenderer):
+    """CSV with a header row; the output reads back with api.parsers.CSVParser."""
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def encode_header(self, fields):
+        return self._write([fields])
+
+    def encode_rows(self, rows, fields):
+        return self._write([self.cell(row.get(field)) for field in fields] for row in rows)
+
+    @staticmethod
+    def cell(value):
+        if value is None:
+            return ''
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, cls=RowJSONEncoder)
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+    @staticmethod
+    def _write(records):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(records)
+        return buffer.getvalue()
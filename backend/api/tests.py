@@ -1,3 +1,1234 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import time
+import uuid
+from decimal import Decimal
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from authentication.models import UserAccount
+from subscriptions.metering import usage_meter
+from subscriptions.models import Plan, Subscription
+from .orders.models import Order, OrderItem
+from .parsers import FastJSONParser, iter_csv
+from .products.export import EXPORT_FIELDS
+from .products.fast_serializers import ProductFastSerializer
+from .products.importer import ProductImporter
+from .products.models import Category, Product, StockReservation
+from .products.search import BasicSearchBackend
+from .products.serializers import ProductListSerializer
+from .products.sharding import reshard, sharded_stock
+from .products.taxonomy import CategoryImporter, paths_from_rows, paths_from_tree
+from .products.tree import get_category_tree
+from .renderers import FastJSONRenderer
+from .utils import SlugAllocator
+
+
+class ProductFastSerializerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        plan = Plan.objects.create(slug='test', name='Test', api_quota=1000)
+        user = UserAccount.objects.create_user(email='shop@example.com', password='x', full_name='Shop')
+        cls.subscription = Subscription.objects.create(user=user, plan=plan)
+        parent = Category.objects.create(subscription=cls.subscription, name='Electronics')
+        child = Category.objects.create(subscription=cls.subscription, name='Phones', parent=parent)
+
+        rows = [
+            # name, category, price, discount_price, stock, is_active, description
+            ('Plain', parent, '10.00', None, 5, True, 'A plain product'),
+            ('Discounted', child, '20.00', '15.50', 0, True, ''),
+            ('Discount above price', child, '9.99', '12.00', 1, False, None),
+            ('Ünicode ✓', parent, '1234567.89', '0.01', 100, True, 'Line\nbreak'),
+        ]
+        for name, category, price, discount_price, stock, is_active, description in rows:
+            Product.objects.create(
+                subscription=cls.subscription,
+                category=category,
+                name=name,
+                price=Decimal(price),
+                discount_price=Decimal(discount_price) if discount_price else None,
+                stock=stock,
+                is_active=is_active,
+                description=description,
+            )
+
+    def queryset(self):
+        return Product.objects.filter(subscription=self.subscription).order_by('name')
+
+    def test_output_matches_product_list_serializer(self):
+        expected = ProductListSerializer(self.queryset().select_related('category'), many=True).data
+        fast = ProductFastSerializer()
+        actual = fast.serialize(fast.rows(self.queryset()))
+
+        self.assertEqual(actual, expected)
+        # Same keys, order and rendering, not just equal values.
+        self.assertEqual(JSONRenderer().render(actual), JSONRenderer().render(expected))
+
+    def test_output_matches_in_other_timezones(self):
+        with timezone.override('Asia/Dhaka'):
+            expected = ProductListSerializer(self.queryset().select_related('category'), many=True).data
+            fast = ProductFastSerializer()
+            actual = fast.serialize(fast.rows(self.queryset()))
+
+        self.assertEqual(JSONRenderer().render(actual), JSONRenderer().render(expected))
+
+    def test_rows_carry_attributes_for_pagination(self):
+        fast = ProductFastSerializer()
+        row = fast.rows(self.queryset()).first()
+        product = self.queryset().first()
+
+        self.assertEqual(row.id, product.pk)
+        self.assertEqual(row.created_at, product.created_at)
+        self.assertEqual(row.final_price, product.get_final_price())
+
+
+class FastJSONTests(TestCase):
+    def test_renderer_output_matches_json_renderer(self):
+        data = {
+            'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'price': Decimal('19.99'),
+            'tiny': Decimal('0.00001'),
+            'huge': Decimal('1E+20'),
+            'created_at': datetime.datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+            'day': datetime.date(2024, 5, 1),
+            'text': 'Ünicode \u2028 line \u2029 separators\n',
+            'items': [1, 2.5, None, True, ('a', 'b')],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            FastJSONRenderer().render(data, 'application/json; indent=4'),
+            JSONRenderer().render(data, 'application/json; indent=4'),
+        )
+
+    def test_parser_matches_json_parser(self):
+        for body in [b'{"a": [1, 2.5, null, "\xc3\x9c"]}', b'{"big": 123456789012345678901234567890}']:
+            self.assertEqual(
+                FastJSONParser().parse(io.BytesIO(body)),
+                JSONParser().parse(io.BytesIO(body)),
+            )
+
+
+def create_subscription(email):
+    plan, _ = Plan.objects.get_or_create(slug='test', defaults={'name': 'Test', 'api_quota': 100000})
+    user = UserAccount.objects.create_user(email=email, password='x', full_name='Shop')
+    return Subscription.objects.create(user=user, plan=plan)
+
+
+class APITestCase(TestCase):
+    """Requests go through the API key of `self.subscription`."""
+
+    def setUp(self):
+        # Catalog versions are bumped on commit, which TestCase never does,
+        # so don't let cached responses leak between tests.
+        cache.clear()
+        self.client = APIClient(HTTP_X_API_KEY=self.subscription.api_key)
+
+    def tearDown(self):
+        # Keep the shared meter empty once the test database is gone.
+        usage_meter.flush()
+
+
+class ProductListTests(APITestCase):
+    url = '/api/products/products/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.subscription = create_subscription('list@example.com')
+        cls.parent = Category.objects.create(subscription=cls.subscription, name='Electronics')
+        cls.add_products(2)
+
+    @classmethod
+    def add_products(cls, count):
+        for number in range(count):
+            category = Category.objects.create(
+                subscription=cls.subscription, name=f'Category {Category.objects.count()}', parent=cls.parent,
+            )
+            Product.objects.create(
+                subscription=cls.subscription, category=category, name=category.name, price=Decimal('1.00'),
+            )
+
+    def test_compact_category(self):
+        response = self.client.get(self.url)
+
+        category = response.json()['results'][0]['category']
+        self.assertEqual(list(category), ['id', 'name', 'breadcrumb'])
+        self.assertEqual([crumb['name'] for crumb in category['breadcrumb']], ['Electronics', category['name']])
+
+    def test_query_count_does_not_grow_with_products_or_categories(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(len(self.client.get(self.url).json()['results']), 2)
+        cache.clear()
+
+        self.add_products(5)
+        with self.assertNumQueries(len(queries)):
+            self.assertEqual(len(self.client.get(self.url).json()['results']), 7)
+
+
+class KeysetPaginationTests(APITestCase):
+    url = '/api/products/products/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.subscription = create_subscription('keyset@example.com')
+        category = Category.objects.create(subscription=cls.subscription, name='All')
+        # Repeated prices, so pages have to break ties on the id.
+        for number, price in enumerate(['5.00', '3.00', '5.00', '1.00', '5.00', '2.00', '3.00']):
+            Product.objects.create(
+                subscription=cls.subscription, category=category,
+                name=f'Product {number}', price=Decimal(price),
+            )
+        cls.expected = [
+            str(pk) for pk in Product.objects.filter(subscription=cls.subscription)
+            .order_by('price', 'pk').values_list('pk', flat=True)
+        ]
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_next_links_walk_every_row_once_in_order(self):
+        page = self.get(self.url, ordering='price', page_size=3)
+        seen = [row['id'] for row in page['results']]
+        self.assertIsNone(page['previous'])
+        while page['next']:
+            page = self.get(page['next'])
+            seen += [row['id'] for row in page['results']]
+
+        self.assertEqual(seen, self.expected)
+
+    def test_descending_order(self):
+        page = self.get(self.url, ordering='-price', page_size=4)
+        page = self.get(page['next'])
+        self.assertEqual([row['id'] for row in page['results']], self.expected[::-1][4:])
+        self.assertIsNone(page['next'])
+
+    def test_previous_link_returns_the_earlier_page(self):
+        first = self.get(self.url, ordering='price', page_size=3)
+        second = self.get(first['next'])
+        third = self.get(second['next'])
+
+        back = self.get(third['previous'])
+        self.assertEqual(back['results'], second['results'])
+        back = self.get(back['previous'])
+        self.assertEqual(back['results'], first['results'])
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_for_another_ordering_is_rejected(self):
+        first = self.get(self.url, ordering='price', page_size=3)
+        cursor = parse_qs(urlsplit(first['next']).query)['cursor'][0]
+        self.assertEqual(self.client.get(self.url, {'ordering': 'price', 'cursor': cursor}).status_code, 200)
+        response = self.client.get(self.url, {'ordering': 'name', 'cursor': cursor})
+        self.assertEqual(response.status_code, 404)
+
+
+class ProductFilterTests(APITestCase):
+    url = '/api/products/products/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.subscription = create_subscription('filters@example.com')
+        create = Category.objects.create
+        cls.electronics = create(subscription=cls.subscription, name='Electronics')
+        cls.phones = create(subscription=cls.subscription, name='Phones', parent=cls.electronics)
+        android = create(subscription=cls.subscription, name='Android', parent=cls.phones)
+        books = create(subscription=cls.subscription, name='Books')
+        for name, category, price, is_active in [
+            ('Laptop', cls.electronics, '900.00', True),
+            ('Galaxy', cls.phones, '800.00', True),
+            ('Pixel', android, '600.00', True),
+            ('Old Pixel', android, '100.00', False),
+            ('Novel', books, '10.00', True),
+        ]:
+            Product.objects.create(
+                subscription=cls.subscription, category=category, name=name,
+                price=Decimal(price), is_active=is_active,
+            )
+
+    def names(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(row['name'] for row in response.json()['results'])
+
+    def test_category_includes_its_descendants(self):
+        self.assertEqual(self.names(category=str(self.phones.pk)), ['Galaxy', 'Old Pixel', 'Pixel'])
+        self.assertEqual(self.names(category=str(self.electronics.pk)), ['Galaxy', 'Laptop', 'Old Pixel', 'Pixel'])
+
+    def test_category_of_another_tenant_matches_nothing(self):
+        other = create_subscription('filters-other@example.com')
+        category = Category.objects.create(subscription=other, name='Electronics')
+        self.assertEqual(self.names(category=str(category.pk)), [])
+
+    def test_is_active(self):
+        self.assertEqual(self.names(is_active='false'), ['Old Pixel'])
+        self.assertEqual(self.names(is_active='1', category=str(self.phones.pk)), ['Galaxy', 'Pixel'])
+
+    def test_price_bounds_are_inclusive(self):
+        self.assertEqual(self.names(min_price='600', max_price='800.00'), ['Galaxy', 'Pixel'])
+        self.assertEqual(self.names(max_price='10'), ['Novel'])
+
+    def test_invalid_values_are_rejected(self):
+        for params in [
+            {'category': 'not-a-uuid'},
+            {'is_active': 'maybe'},
+            {'on_sale': 'yes please'},
+            {'min_price': 'cheap'},
+            {'max_price': 'NaN'},
+            {'min_price': 'Infinity'},
+        ]:
+            with self.subTest(params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(list(response.json()), list(params))
+
+
+class FinalPriceTests(APITestCase):
+    url = '/api/products/products/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.subscription = create_subscription('final-price@example.com')
+        category = Category.objects.create(subscription=cls.subscription, name='All')
+        # name, price, discount_price: final prices 8, 10, 6, 9, 3.
+        for name, price, discount_price in [
+            ('Discounted', '20.00', '8.00'),
+            ('Plain', '10.00', None),
+            ('Cheap discount', '7.00', '6.00'),
+            ('Discount above price', '9.00', '12.00'),
+            ('Cheapest', '3.00', None),
+        ]:
+            Product.objects.create(
+                subscription=cls.subscription, category=category, name=name,
+                price=Decimal(price), discount_price=discount_price and Decimal(discount_price),
+            )
+
+    def names(self, **params):
+        response = self.client.get(self.url, {'ordering': 'final_price', **params})
+        self.assertEqual(response.status_code, 200)
+        return [row['name'] for row in response.json()['results']]
+
+    def test_stored_columns(self):
+        products = {p.name: p for p in Product.objects.filter(subscription=self.subscription)}
+        self.assertEqual(products['Discounted'].final_price, Decimal('8.00'))
+        self.assertEqual(products['Plain'].final_price, Decimal('10.00'))
+        # A discount price above the price is still charged, but isn't a discount.
+        self.assertEqual(products['Discount above price'].final_price, Decimal('12.00'))
+        self.assertFalse(products['Discount above price'].has_discount)
+        self.assertTrue(products['Cheap discount'].has_discount)
+
+    def test_on_sale(self):
+        self.assertEqual(self.names(on_sale='true'), ['Cheap discount', 'Discounted'])
+        self.assertEqual(self.names(on_sale='false'), ['Cheapest', 'Plain', 'Discount above price'])
+
+    def test_price_bounds_apply_to_the_final_price(self):
+        # Discounted's price of 20 is outside the bounds, its final price of 8 isn't.
+        self.assertEqual(self.names(min_price='6', max_price='10'), ['Cheap discount', 'Discounted', 'Plain'])
+        self.assertEqual(self.names(min_price='10.01'), ['Discount above price'])
+
+    def test_cursors_walk_the_final_price_order(self):
+        response = self.client.get(self.url, {'ordering': 'final_price', 'page_size': 2})
+        page = response.json()
+        seen = [row['final_price'] for row in page['results']]
+        while page['next']:
+            page = self.client.get(page['next']).json()
+            seen += [row['final_price'] for row in page['results']]
+
+        self.assertEqual(seen, [3, 6, 8, 10, 12])
+        self.assertEqual(
+            self.names(ordering='-final_price'),
+            ['Discount above price', 'Plain', 'Discounted', 'Cheap discount', 'Cheapest'],
+        )
+
+
+class SparseFieldsetTests(APITestCase):
+    url = '/api/products/products/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.subscription = create_subscription('fieldsets@example.com')
+        parent = Category.objects.create(subscription=cls.subscription, name='Electronics')
+        cls.category = Category.objects.create(subscription=cls.subscription, name='Phones', parent=parent)
+        for number in range(2):
+            cls.add_product(number)
+
+    @classmethod
+    def add_product(cls, number):
+        Product.objects.create(
+            subscription=cls.subscription, category=cls.category,
+            name=f'Product {number}', description='Long text', price=Decimal('2.00'),
+        )
+
+    def get(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        listing = [query['sql'] for query in queries if 'FROM "api_product"' in query['sql']]
+        return response.json()['results'], listing
+
+    def test_fields_keeps_only_those_fields_and_columns(self):
+        rows, [sql] = self.get(fields='price,name')
+
+        self.assertEqual(list(rows[0]), ['name', 'price'])
+        self.assertNotIn('"description"', sql)
+        self.assertNotIn('api_category', sql)
+
+    def test_omit_drops_fields_and_columns(self):
+        rows, [sql] = self.get(omit='description,category')
+
+        self.assertNotIn('description', rows[0])
+        self.assertNotIn('category', rows[0])
+        self.assertIn('final_price', rows[0])
+        self.assertNotIn('"description"', sql)
+        self.assertNotIn('api_category', sql)
+
+    def test_expanded_category_with_fields(self):
+        rows, _ = self.get(expand='category', fields='name,category')
+
+        self.assertEqual(list(rows[0]), ['category', 'name'])
+        self.assertEqual(rows[0]['category']['breadcrumb'][0]['name'], 'Electronics')
+        rows, [sql] = self.get(expand='category', fields='name')
+        self.assertEqual(list(rows[0]), ['name'])
+        self.assertNotIn('"description"', sql)
+
+    def test_unknown_fields_are_rejected(self):
+        for params in [{'fields': 'name,colour'}, {'omit': 'colour'}, {'fields': 'name', 'omit': 'name'}]:
+            with self.subTest(params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 400)
+        response = self.client.get(self.url, {'fields': 'colour'})
+        self.assertIn('Unknown field(s): colour.', response.json()['fields'])
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        for number, params in enumerate([
+            {'fields': 'name,category'},
+            {'expand': 'category', 'fields': 'name,category'},
+            {'expand': 'category'},
+        ]):
+            with self.subTest(params):
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(self.url, params)
+                cache.clear()
+                self.add_product(10 + number)
+                with self.assertNumQueries(len(queries)):
+                    self.client.get(self.url, params)
+                cache.clear()
+
+
+class ProductImporterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.subscription = create_subscription('import@example.com')
+        cls.category = Category.objects.create(subscription=cls.subscription, name='Clothing')
+        Product.objects.create(subscription=cls.subscription, category=cls.category, name='T-Shirt', price=Decimal('5.00'))
+
+    def row(self, **fields):
+        return {'category_id': str(self.category.pk), 'name': 'T-Shirt', 'price': '9.99', **fields}
+
+    def slugs(self):
+        return set(Product.objects.filter(subscription=self.subscription).values_list('slug', flat=True))
+
+    def test_generated_slugs_get_the_next_free_suffixes(self):
+        Product.objects.create(
+            subscription=self.subscription, category=self.category,
+            name='Other', slug='t-shirt-7', price=Decimal('5.00'),
+        )
+        result = ProductImporter(self.subscription).run([self.row(), self.row(), self.row(name='Mug')])
+
+        self.assertEqual(result, {'created': 3, 'failed': 0, 'errors': []})
+        self.assertEqual(self.slugs(), {'t-shirt', 't-shirt-7', 't-shirt-8', 't-shirt-9', 'mug'})
+
+    def test_invalid_rows_are_reported_by_row_number(self):
+        rows = [
+            self.row(name='Good'),
+            self.row(price='free'),
+            self.row(category_id=str(uuid.uuid4())),
+            self.row(slug='t-shirt'),
+            self.row(name='Also good', slug='custom'),
+            self.row(name='Duplicate', slug='custom'),
+        ]
+        result = ProductImporter(self.subscription, chunk_size=4).run(rows)
+
+        self.assertEqual(result['created'], 2)
+        self.assertEqual(result['failed'], 4)
+        errors = {error['row']: error['errors'] for error in result['errors']}
+        self.assertEqual(sorted(errors), [2, 3, 4, 6])
+        self.assertIn('price', errors[2])
+        self.assertEqual(errors[3], {'category_id': ['Category not found.']})
+        self.assertEqual(errors[4], {'slug': ['This slug already exists.']})
+        self.assertEqual(errors[6], {'slug': ['This slug already exists.']})
+        self.assertEqual(self.slugs(), {'t-shirt', 'good', 'custom'})
+
+    def test_save_raises_when_every_slug_attempt_collides(self):
+        product = Product(subscription=self.subscription, category=self.category, name='Mug', price=Decimal('3.00'))
+        # As if a concurrent insert took each allocated slug first.
+        with mock.patch.object(SlugAllocator, 'allocate_one', return_value='t-shirt'):
+            with self.assertRaises(IntegrityError):
+                product.save()
+
+        self.assertEqual(self.slugs(), {'t-shirt'})
+        self.assertFalse(Product.objects.filter(slug='').exists())
+
+    def test_allocator_is_scoped_per_subscription(self):
+        other = create_subscription('other-import@example.com')
+        allocator = SlugAllocator(Product)
+
+        self.assertEqual(allocator.allocate(['T-Shirt'], subscription=other), ['t-shirt'])
+        self.assertEqual(allocator.allocate(['T-Shirt'], subscription=self.subscription), ['t-shirt-2'])
+
+
+class ProductBulkUpdateTests(APITestCase):
+    url = '/api/products/products/bulk/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.subscription = create_subscription('bulk@example.com')
+        category = Category.objects.create(subscription=cls.subscription, name='All')
+        cls.first, cls.second = [
+            Product.objects.create(
+                subscription=cls.subscription, category=category,
+                name=name, price=Decimal('10.00'), stock=5,
+            )
+            for name in ('First', 'Second')
+        ]
+        other = create_subscription('bulk-other@example.com')
+        cls.foreign = Product.objects.create(
+            subscription=other, category=Category.objects.create(subscription=other, name='All'),
+            name='Foreign', price=Decimal('10.00'), stock=3,
+        )
+
+    def test_errors_are_keyed_by_index_and_valid_items_applied(self):
+        response = self.client.patch(self.url, [
+            {'id': str(self.first.pk), 'price': '12.50'},
+            {'id': str(self.first.pk)},
+            {'slug': 'missing', 'stock': 1},
+            {'id': str(self.foreign.pk), 'stock': 0},
+            {'slug': self.second.slug, 'stock': -1},
+            {'slug': self.second.slug, 'stock': 2, 'is_active': False},
+        ], format='json')
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['updated'], 2)
+        self.assertEqual(body['failed'], 4)
+        self.assertEqual([error['index'] for error in body['errors']], [1, 2, 3, 4])
+        self.assertEqual(body['errors'][1]['errors'], {'non_field_errors': ['Product not found.']})
+        self.assertEqual(body['errors'][2]['errors'], {'non_field_errors': ['Product not found.']})
+        self.assertIn('stock', body['errors'][3]['errors'])
+
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.foreign.refresh_from_db()
+        self.assertEqual((self.first.price, self.first.stock), (Decimal('12.50'), 5))
+        self.assertEqual((self.second.stock, self.second.is_active), (2, False))
+        self.assertEqual(self.foreign.stock, 3)
+
+    def test_body_must_be_a_list(self):
+        response = self.client.patch(self.url, {'id': str(self.first.pk)}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class StockReservationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.subscription = create_subscription('reserve@example.com')
+        category = Category.objects.create(subscription=cls.subscription, name='All')
+        cls.plain, cls.hot = [
+            Product.objects.create(
+                subscription=cls.subscription, category=category,
+                name=name, price=Decimal('10.00'), stock=stock,
+            )
+            for name, stock in (('Plain', 5), ('Hot', 10))
+        ]
+        # Spread over shards, e.g. [3, 3, 2, 2]: no single shard can serve 4.
+        reshard(cls.hot.pk, 4)
+
+    def reserve(self, items, **extra):
+        return self.client.post('/api/products/reservations/', {
+            'items': [{'product_id': str(product.pk), 'quantity': quantity} for product, quantity in items],
+            **extra,
+        }, format='json')
+
+    def stock(self):
+        self.plain.refresh_from_db()
+        return self.plain.stock, sharded_stock([self.hot.pk])[self.hot.pk]
+
+    def test_shortfall_is_409_and_deducts_nothing(self):
+        response = self.reserve([(self.plain, 3), (self.hot, 11)])
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json(), {'shortfalls': [
+            {'product_id': str(self.hot.pk), 'requested': 11, 'available': 10},
+        ]})
+        self.assertEqual(self.stock(), (5, 10))
+
+    def test_repeated_items_are_merged_before_checking(self):
+        response = self.reserve([(self.plain, 3), (self.plain, 3)])
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['shortfalls'][0]['requested'], 6)
+        self.assertEqual(self.stock(), (5, 10))
+
+    def test_quantity_spanning_several_shards(self):
+        response = self.reserve([(self.hot, 9)])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.stock(), (5, 1))
+
+    def test_hold_release_returns_stock(self):
+        response = self.reserve([(self.plain, 5), (self.hot, 4)], hold_seconds=60)
+        self.assertEqual(response.status_code, 201)
+        hold_id = response.json()['hold_id']
+        self.assertEqual(self.stock(), (0, 6))
+        self.assertEqual(self.reserve([(self.plain, 1)]).status_code, 409)
+
+        response = self.client.post('/api/products/reservations/release/', {'hold_ids': [hold_id]}, format='json')
+        self.assertEqual(response.json(), {'released': 2})
+        self.assertEqual(self.stock(), (5, 10))
+        self.assertFalse(StockReservation.objects.exists())
+
+        # The hold is gone, so releasing it again returns no stock.
+        response = self.client.post('/api/products/reservations/release/', {'hold_ids': [hold_id]}, format='json')
+        self.assertEqual(response.json(), {'released': 0})
+        self.assertEqual(self.stock(), (5, 10))
+
+    def test_commit_keeps_the_deduction(self):
+        hold_id = self.reserve([(self.plain, 2)], hold_seconds=60).json()['hold_id']
+
+        response = self.client.post('/api/products/reservations/commit/', {'hold_ids': [hold_id]}, format='json')
+        self.assertEqual(response.json(), {'committed': 1})
+        self.assertEqual(self.stock(), (3, 10))
+        response = self.client.post('/api/products/reservations/release/', {'hold_ids': [hold_id]}, format='json')
+        self.assertEqual(response.json(), {'released': 0})
+        self.assertEqual(self.stock(), (3, 10))
+
+
+class CategoryImporterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.subscription = create_subscription('taxonomy@example.com')
+        electronics = Category.objects.create(subscription=cls.subscription, name='Electronics')
+        Category.objects.create(subscription=cls.subscription, name='Phones', parent=electronics)
+        Category.objects.create(subscription=cls.subscription, name='Books')
+        # Another tenant's tree shares the table and must stay untouched.
+        other = create_subscription('taxonomy-other@example.com')
+        Category.objects.create(subscription=other, name='Garden')
+
+    def tree_state(self):
+        return list(Category.objects.order_by('tree_id', 'lft').values_list(
+            'name', 'parent__name', 'tree_id', 'lft', 'rght', 'level', 'path_names'
+        ))
+
+    def assert_matches_rebuild(self):
+        imported = self.tree_state()
+        Category.objects.rebuild()
+        self.assertEqual(imported, self.tree_state())
+
+    def test_tree_import_matches_a_full_rebuild(self):
+        result = CategoryImporter(self.subscription).run(paths_from_tree([
+            {'name': 'Electronics', 'children': [
+                {'name': 'Phones', 'children': [{'name': 'Android'}, {'name': 'Apple'}]},
+                {'name': 'Cameras'},
+                {'name': 'Audio', 'children': [{'name': 'Headphones'}]},
+            ]},
+            {'name': 'Appliances', 'children': [{'name': 'Kitchen'}]},
+            # New roots land between and after existing trees, of any tenant.
+            {'name': 'Furniture'},
+            {'name': 'Zoo'},
+            {'name': 'Yard'},
+        ]))
+
+        self.assertEqual(result, {'created': 10, 'failed': 0, 'errors': []})
+        self.assert_matches_rebuild()
+
+    def test_rows_import_reuses_existing_nodes_and_reports_bad_rows(self):
+        result = CategoryImporter(self.subscription).run(paths_from_rows([
+            {'path': 'Books > Fiction > Fantasy'},
+            {'path': 'Books > Fiction'},
+            {'name': 'no path column'},
+            {'path': 'Electronics > Phones'},
+        ]))
+
+        self.assertEqual(result['created'], 2)
+        self.assertEqual([error['row'] for error in result['errors']], [3])
+        self.assertEqual(
+            Category.objects.filter(subscription=self.subscription, name='Fiction').count(), 1
+        )
+        self.assert_matches_rebuild()
+
+    def test_nodes_created_later_through_the_model_keep_the_tree_valid(self):
+        CategoryImporter(self.subscription).run(paths_from_rows([{'path': 'Books > Comics'}]))
+        books = Category.objects.get(subscription=self.subscription, name='Books')
+        Category.objects.create(subscription=self.subscription, name='Art', parent=books)
+
+        self.assert_matches_rebuild()
+
+
+class CategoryPathTests(TestCase):
+    def setUp(self):
+        self.subscription = create_subscription('paths@example.com')
+        self.electronics = Category.objects.create(subscription=self.subscription, name='Electronics')
+        self.phones = Category.objects.create(subscription=self.subscription, name='Phones', parent=self.electronics)
+        self.android = Category.objects.create(subscription=self.subscription, name='Android', parent=self.phones)
+        self.books = Category.objects.create(subscription=self.subscription, name='Books')
+
+    def paths(self):
+        return {c.name: c.path_names for c in Category.objects.all()}
+
+    def assert_paths_stored(self):
+        for category in Category.objects.all():
+            expected = [a.name for a in category.get_ancestors(include_self=True)]
+            self.assertEqual(category.path_names, expected, category.name)
+
+    def test_rename_rewrites_descendant_paths(self):
+        electronics = Category.objects.get(pk=self.electronics.pk)
+        electronics.name = 'Devices'
+        electronics.save()
+
+        self.assertEqual(self.paths()['Android'], ['Devices', 'Phones', 'Android'])
+        self.assert_paths_stored()
+
+    def test_parent_change_rewrites_descendant_paths(self):
+        phones = Category.objects.get(pk=self.phones.pk)
+        phones.parent = Category.objects.get(pk=self.books.pk)
+        phones.save()
+
+        self.assertEqual(self.paths()['Android'], ['Books', 'Phones', 'Android'])
+        self.assert_paths_stored()
+
+    def test_move_to_rewrites_descendant_paths(self):
+        phones = Category.objects.get(pk=self.phones.pk)
+        phones.move_to(Category.objects.get(pk=self.books.pk), 'last-child')
+
+        self.assertEqual(self.paths()['Android'], ['Books', 'Phones', 'Android'])
+        self.assert_paths_stored()
+
+    def test_stale_instance_rewrites_its_own_descendants(self):
+        # Books sorts before Electronics, so its new child shifts the
+        # Electronics tree; self.electronics still holds the old bounds.
+        Category.objects.create(subscription=self.subscription, name='Fiction', parent=self.books)
+        Category.objects.create(subscription=self.subscription, name='Appliances')
+
+        self.electronics.name = 'Devices'
+        self.electronics.save()
+
+        self.assertEqual(self.paths()['Android'], ['Devices', 'Phones', 'Android'])
+        self.assertEqual(self.paths()['Fiction'], ['Books', 'Fiction'])
+        self.assert_paths_stored()
+        tree = list(Category.objects.order_by('tree_id', 'lft').values_list('name', 'tree_id', 'lft', 'rght'))
+        Category.objects.rebuild()
+        self.assertEqual(tree, list(Category.objects.order_by('tree_id', 'lft').values_list('name', 'tree_id', 'lft', 'rght')))
+
+
+class CategoryTreeTests(APITestCase):
+    url = '/api/products/categories/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.subscription = create_subscription('tree@example.com')
+        create = Category.objects.create
+        cls.electronics = create(subscription=cls.subscription, name='Electronics')
+        cls.phones = create(subscription=cls.subscription, name='Phones', parent=cls.electronics)
+        cls.android = create(subscription=cls.subscription, name='Android', parent=cls.phones)
+        cls.books = create(subscription=cls.subscription, name='Books')
+        for category, active, inactive in [(cls.electronics, 1, 0), (cls.phones, 2, 1), (cls.android, 3, 0)]:
+            for number in range(active + inactive):
+                Product.objects.create(
+                    subscription=cls.subscription, category=category, name=f'{category.name} {number}',
+                    price=Decimal('1.00'), is_active=number < active,
+                )
+
+    def get(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def counts(self, nodes):
+        result = {}
+        for node in nodes:
+            result[node['name']] = (node['product_count'], node['total_product_count'])
+            result.update(self.counts(node['children']))
+        return result
+
+    def test_counts_include_active_products_of_the_whole_subtree(self):
+        self.assertEqual(self.counts(self.get()), {
+            'Books': (0, 0),
+            'Electronics': (1, 6),
+            'Phones': (2, 5),
+            'Android': (3, 3),
+        })
+
+    def test_counts_include_levels_cut_off_by_depth(self):
+        self.assertEqual(self.counts(self.get(depth=0)), {'Books': (0, 0), 'Electronics': (1, 6)})
+        self.assertEqual(self.counts(self.get(root=str(self.phones.pk), depth=0)), {'Phones': (2, 5)})
+
+    def test_subtree_root_keeps_its_breadcrumb(self):
+        [phones] = self.get(root=str(self.phones.pk))
+
+        self.assertEqual(phones['breadcrumb'], [
+            {'id': str(self.electronics.pk), 'name': 'Electronics'},
+            {'id': str(self.phones.pk), 'name': 'Phones'},
+        ])
+        [android] = phones['children']
+        self.assertNotIn('breadcrumb', android)
+
+    def names(self, nodes):
+        return [(node['name'], self.names(node['children'])) for node in nodes]
+
+    def test_root_and_depth(self):
+        self.assertEqual(self.names(self.get(depth=1)), [
+            ('Books', []), ('Electronics', [('Phones', [])]),
+        ])
+        self.assertEqual(self.names(self.get(root=str(self.phones.pk))), [('Phones', [('Android', [])])])
+        self.assertEqual(self.names(self.get(root=str(self.android.pk), depth=3)), [('Android', [])])
+
+    def test_unknown_root_is_not_found(self):
+        other = create_subscription('tree-other@example.com')
+        for root in [uuid.uuid4(), Category.objects.create(subscription=other, name='Other').pk]:
+            with self.subTest(root=root):
+                self.assertEqual(self.client.get(self.url, {'root': str(root)}).status_code, 404)
+
+    def test_invalid_root_and_depth_are_rejected(self):
+        for params in [{'root': 'nope'}, {'depth': '-1'}, {'depth': 'deep'}]:
+            with self.subTest(params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+    def test_tree_takes_a_constant_number_of_queries(self):
+        def tree_queries():
+            with CaptureQueriesContext(connection) as context:
+                self.get()
+            cache.clear()
+            return len(context)
+
+        before = tree_queries()
+        parent = self.android
+        for number in range(5):
+            parent = Category.objects.create(subscription=self.subscription, name=f'Level {number}', parent=parent)
+            Product.objects.create(
+                subscription=self.subscription, category=parent, name=f'Deep {number}', price=Decimal('1.00'),
+            )
+        self.assertEqual(tree_queries(), before)
+        with self.assertNumQueries(2):
+            get_category_tree(self.subscription)
+
+
+class ProductSearchTests(APITestCase):
+    """Runs on the database's own backend (FTS5 on SQLite, tsvector on PostgreSQL)."""
+    url = '/api/products/products/search/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.subscription = create_subscription('fts@example.com')
+        cls.category = Category.objects.create(subscription=cls.subscription, name='All')
+        cls.products = {
+            name: Product.objects.create(
+                subscription=cls.subscription, category=cls.category,
+                name=name, description=description, price=Decimal('4.00'),
+            )
+            for name, description in [
+                ('Plate', 'Blue ceramic plate'),
+                ('Blue mug', 'Ceramic'),
+                ('Red mug', 'Ceramic'),
+            ]
+        }
+        other = create_subscription('fts-other@example.com')
+        cls.other_mug = Product.objects.create(
+            subscription=other, category=Category.objects.create(subscription=other, name='All'),
+            name='Blue mug', price=Decimal('4.00'),
+        )
+
+    def search(self, query):
+        response = self.client.get(self.url, {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [row['name'] for row in response.json()]
+
+    def test_name_matches_rank_first(self):
+        self.assertEqual(self.search('blue'), ['Blue mug', 'Plate'])
+        self.assertEqual(sorted(self.search('ceramic mug')), ['Blue mug', 'Red mug'])
+
+    def test_other_tenants_products_are_not_found(self):
+        response = self.client.get(self.url, {'q': 'blue mug'})
+
+        self.assertEqual([row['id'] for row in response.json()], [str(self.products['Blue mug'].pk)])
+
+    def test_rename_replaces_the_indexed_terms(self):
+        product = self.products['Red mug']
+        product.name = 'Red cup'
+        product.save()
+
+        self.assertEqual(sorted(self.search('mug')), ['Blue mug'])
+        self.assertEqual(self.search('cup'), ['Red cup'])
+
+    def test_deleted_products_are_not_found(self):
+        self.products['Blue mug'].delete()
+
+        self.assertEqual(self.search('blue'), ['Plate'])
+
+    def test_imported_products_are_found(self):
+        result = ProductImporter(self.subscription).run([
+            {'category_id': str(self.category.pk), 'name': 'Teapot', 'description': 'Blue glaze', 'price': '9.00'},
+        ])
+        self.assertEqual(result['created'], 1)
+
+        self.assertEqual(self.search('teapot'), ['Teapot'])
+        self.assertEqual(self.search('glaze'), ['Teapot'])
+
+
+class BasicSearchBackendTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.subscription = create_subscription('search@example.com')
+        category = Category.objects.create(subscription=cls.subscription, name='All')
+        for name, description in [
+            ('Blue mug', 'Ceramic'),
+            ('Plate', 'Blue ceramic plate'),
+            ('Red mug', 'Ceramic'),
+        ]:
+            Product.objects.create(
+                subscription=cls.subscription, category=category,
+                name=name, description=description, price=Decimal('4.00'),
+            )
+        other = create_subscription('search-other@example.com')
+        Product.objects.create(
+            subscription=other, category=Category.objects.create(subscription=other, name='All'),
+            name='Blue mug', price=Decimal('4.00'),
+        )
+
+    def search(self, query):
+        queryset = Product.objects.all()
+        return [p.name for p in BasicSearchBackend().search(queryset, self.subscription, query, 10)]
+
+    def test_all_terms_must_match_with_name_matches_first(self):
+        self.assertEqual(self.search('blue'), ['Blue mug', 'Plate'])
+        self.assertEqual(self.search('ceramic mug'), ['Blue mug', 'Red mug'])
+        self.assertEqual(self.search('!!'), [])
+
+    @override_settings(PRODUCT_SEARCH_BACKEND='api.products.search.BasicSearchBackend')
+    def test_search_endpoint_with_the_fallback_backend(self):
+        response = self.client.get('/api/products/products/search/', {'q': 'mug'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(row['name'] for row in response.json()), ['Blue mug', 'Red mug'])
+
+
+class ProductExportTests(APITestCase):
+    url = '/api/products/products/export/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.subscription = create_subscription('export@example.com')
+        cls.category = Category.objects.create(subscription=cls.subscription, name='All')
+        for name, price, is_active in [('Mug', '4.50', True), ('Plate, large', '12.00', False)]:
+            Product.objects.create(
+                subscription=cls.subscription, category=cls.category, name=name,
+                description='Line\nbreak', price=Decimal(price), is_active=is_active,
+            )
+        other = create_subscription('export-other@example.com')
+        Product.objects.create(
+            subscription=other, category=Category.objects.create(subscription=other, name='All'),
+            name='Not mine', price=Decimal('1.00'),
+        )
+
+    def export(self, params=None, **headers):
+        response = self.client.get(self.url, params, **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_ndjson_is_the_default(self):
+        response, body = self.export()
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="products.ndjson"')
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual([row['name'] for row in rows], ['Mug', 'Plate, large'])
+        self.assertEqual(list(rows[0]), list(EXPORT_FIELDS))
+        self.assertEqual(rows[0]['price'], '4.50')
+
+    def test_csv_with_the_format_parameter_or_accept_header(self):
+        for params, headers in [({'format': 'csv'}, {}), (None, {'HTTP_ACCEPT': 'text/csv'})]:
+            with self.subTest(params=params, headers=headers):
+                response, body = self.export(params, **headers)
+
+                self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+                rows = list(iter_csv(io.BytesIO(body)))
+                self.assertEqual([row['name'] for row in rows], ['Mug', 'Plate, large'])
+                self.assertEqual(rows[0]['description'], 'Line\nbreak')
+
+    def test_ndjson_with_the_accept_header_and_filters(self):
+        _, body = self.export({'is_active': 'true'}, HTTP_ACCEPT='application/x-ndjson')
+
+        self.assertEqual([json.loads(line)['name'] for line in body.decode().splitlines()], ['Mug'])
+
+    def test_export_imports_again(self):
+        _, body = self.export({'format': 'csv'})
+        Product.objects.filter(subscription=self.subscription).delete()
+
+        response = self.client.generic('POST', '/api/products/products/import/', body, content_type='text/csv')
+        self.assertEqual(response.json()['created'], 2)
+        self.assertEqual(
+            sorted(Product.objects.filter(subscription=self.subscription).values_list('name', 'price', 'is_active')),
+            [('Mug', Decimal('4.50'), True), ('Plate, large', Decimal('12.00'), False)],
+        )
+
+
+class ProductImportViewTests(APITestCase):
+    url = '/api/products/products/import/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.subscription = create_subscription('import-view@example.com')
+        cls.category = Category.objects.create(subscription=cls.subscription, name='All')
+
+    def post(self, body, content_type):
+        return self.client.generic('POST', self.url, body, content_type=content_type)
+
+    def line(self, name):
+        return ('{"category_id": "%s", "name": "%s", "price": "2.50"}\n' % (self.category.pk, name)).encode()
+
+    def test_ndjson_lines_that_fail_to_decode_are_row_errors(self):
+        body = self.line('Good') + b'{"name": "\xff\xfe"}\n' + b'{"name": \n' + b'[1, 2]\n' + self.line('Also good')
+        response = self.post(body, 'application/x-ndjson')
+
+        self.assertEqual(response.status_code, 200)
+        result = response.json()
+        self.assertEqual(result['created'], 2)
+        errors = {error['row']: error['errors']['non_field_errors'][0] for error in result['errors']}
+        self.assertEqual(sorted(errors), [2, 3, 4])
+        self.assertTrue(errors[2].startswith('Invalid utf-8 text'))
+        self.assertTrue(errors[3].startswith('Invalid JSON'))
+        self.assertEqual(errors[4], 'Expected a JSON object.')
+
+    def test_csv_rows_that_fail_to_parse_are_row_errors(self):
+        body = b''.join([
+            b'category_id,name,price\n',
+            f'{self.category.pk},Good,2.50\n'.encode(),
+            f'{self.category.pk},Caf\xe9,2.50\n'.encode('latin-1'),
+            f'{self.category.pk},Bro\rken,2.50\n'.encode(),
+            f'{self.category.pk},Also good,2.50\n'.encode(),
+        ])
+        response = self.post(body, 'text/csv')
+
+        self.assertEqual(response.status_code, 200)
+        result = response.json()
+        self.assertEqual((result['created'], result['failed']), (2, 2))
+        errors = {error['row']: error['errors']['non_field_errors'][0] for error in result['errors']}
+        self.assertEqual(sorted(errors), [2, 3])
+        self.assertTrue(errors[2].startswith('Invalid utf-8 text'))
+        self.assertTrue(errors[3].startswith('Invalid CSV'))
+        self.assertEqual(
+            sorted(Product.objects.filter(subscription=self.subscription).values_list('name', flat=True)),
+            ['Also good', 'Good'],
+        )
+
+    def test_csv_with_an_undecodable_header_is_a_parse_error(self):
+        body = 'category_id,n\xe4me,price\n'.encode('latin-1')
+        response = self.post(body, 'text/csv')
+
+        self.assertEqual(response.status_code, 400)
+
+
+class ConditionalGetTests(APITestCase):
+    url = '/api/products/products/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.subscription = create_subscription('etag@example.com')
+        cls.category = Category.objects.create(subscription=cls.subscription, name='All')
+        for number in range(3):
+            Product.objects.create(
+                subscription=cls.subscription, category=cls.category,
+                name=f'Product {number}', price=Decimal('1.00'),
+            )
+
+    def test_matching_if_none_match_is_304(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_repeated_requests_are_cache_hits(self):
+        first = self.client.get(self.url)
+        second = self.client.get(self.url)
+
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(first['ETag'], second['ETag'])
+
+    def test_catalog_write_changes_the_etag_and_misses(self):
+        first = self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(
+                subscription=self.subscription, category=self.category,
+                name='New', price=Decimal('1.00'),
+            )
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertEqual(len(response.json()['results']), 4)
+
+    def test_if_modified_since_does_not_hide_a_write_in_the_same_second(self):
+        first = self.client.get(self.url)
+        self.assertNotIn('Last-Modified', first)
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(
+                subscription=self.subscription, category=self.category,
+                name='New', price=Decimal('1.00'),
+            )
+
+        # HTTP dates have whole seconds; any date must not mask the write.
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 4)
+
+    @override_settings(ALLOWED_HOSTS=['a.example.com', 'b.example.com'])
+    def test_links_are_not_shared_between_hosts(self):
+        params = {'page_size': 1}
+        first = self.client.get(self.url, params, HTTP_HOST='a.example.com')
+        other = self.client.get(self.url, params, HTTP_HOST='b.example.com', secure=True)
+
+        self.assertEqual(other['X-Cache'], 'MISS')
+        self.assertNotEqual(first['ETag'], other['ETag'])
+        self.assertTrue(first.json()['next'].startswith('http://a.example.com/'))
+        self.assertTrue(other.json()['next'].startswith('https://b.example.com/'))
+
+
+class OrderCreateTests(APITestCase):
+    url = '/api/orders/orders/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.subscription = create_subscription('orders@example.com')
+        category = Category.objects.create(subscription=cls.subscription, name='All')
+        cls.products = [
+            Product.objects.create(
+                subscription=cls.subscription, category=category, name=f'Product {i}',
+                price=Decimal('10.00'), discount_price=Decimal('7.50') if i % 2 else None,
+            )
+            for i in range(50)
+        ]
+        other = create_subscription('orders-other@example.com')
+        cls.foreign = Product.objects.create(
+            subscription=other, category=Category.objects.create(subscription=other, name='All'),
+            name='Foreign', price=Decimal('10.00'),
+        )
+
+    def lines(self, count):
+        return [{'product_id': str(p.pk), 'quantity': 2} for p in self.products[:count]]
+
+    def test_lines_snapshot_the_product_and_add_up_to_the_total(self):
+        response = self.client.post(self.url, {'items': self.lines(2)}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        items = response.json()['items']
+        self.assertEqual([i['line_number'] for i in items], [1, 2])
+        self.assertEqual([i['unit_price'] for i in items], ['10.00', '7.50'])
+        self.assertEqual(items[1]['product_name'], 'Product 1')
+        self.assertEqual(response.json()['total_amount'], '35.00')
+
+        # Later catalog changes don't alter the order.
+        Product.objects.filter(pk=self.products[0].pk).update(name='Renamed', price=Decimal('99.00'))
+        item = OrderItem.objects.get(line_number=1)
+        self.assertEqual((item.product_name, item.unit_price), ('Product 0', Decimal('10.00')))
+
+    def test_query_count_does_not_grow_with_the_line_count(self):
+        self.client.post(self.url, {'items': self.lines(1)}, format='json')
+
+        counts = []
+        for count in (1, 50):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(self.url, {'items': self.lines(count)}, format='json')
+            self.assertEqual(response.status_code, 201)
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(OrderItem.objects.filter(order_id=response.json()['id']).count(), 50)
+
+    def test_products_of_other_subscriptions_are_rejected(self):
+        lines = self.lines(1) + [{'product_id': str(self.foreign.pk), 'quantity': 1}]
+        response = self.client.post(self.url, {'items': lines}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['items'][0], {})
+        self.assertIn('product_id', response.json()['items'][1])
+        self.assertFalse(Order.objects.exists())
+
+    def test_quantities_and_totals_beyond_the_columns_are_rejected(self):
+        product = self.products[0]
+        response = self.client.post(self.url, {'items': [
+            {'product_id': str(product.pk), 'quantity': 2**31},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('quantity', response.json()['items'][0])
+
+        # A valid quantity whose total needs more than total_amount's 12 integer digits.
+        Product.objects.filter(pk=product.pk).update(price=Decimal('99999999.99'))
+        response = self.client.post(self.url, {'items': [
+            {'product_id': str(product.pk), 'quantity': 20000},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'non_field_errors': ['The order total is too large.']})
+        self.assertFalse(Order.objects.exists())
+
+    def test_order_and_lines_are_saved_in_one_transaction(self):
+        with mock.patch.object(OrderItem.objects, 'bulk_create', side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                self.client.post(self.url, {'items': self.lines(3)}, format='json')
+
+        self.assertFalse(Order.objects.exists())
+
+    def test_list_prefetches_the_lines(self):
+        for _ in range(3):
+            self.client.post(self.url, {'items': self.lines(5)}, format='json')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        table = OrderItem._meta.db_table
+        self.assertEqual(sum(table in q['sql'] for q in queries), 1)
+
+
+class CacheStatsViewTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.subscription = create_subscription('stats@example.com')
+        cls.staff = UserAccount.objects.create_user(email='staff@example.com', password='x', full_name='Staff')
+        cls.staff.is_staff = True
+        cls.staff.save()
+
+    def test_staff_see_hit_ratios(self):
+        self.client.get('/api/products/products/')
+        self.client.get('/api/products/products/')
+
+        staff = APIClient()
+        staff.force_authenticate(self.staff)
+        response = staff.get('/api/cache-stats/')
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertGreaterEqual(body['responses']['hits'], 1)
+        self.assertIn('hit_ratio', body['responses'])
+        self.assertIn('hit_ratio', body['subscriptions'])
+
+    def test_other_users_are_refused(self):
+        user = APIClient()
+        user.force_authenticate(UserAccount.objects.create_user(email='user@example.com', password='x', full_name='U'))
+        self.assertEqual(user.get('/api/cache-stats/').status_code, 403)
@@ -1,6 +1,9 @@
 from django.urls import path, include
 
+from .views import CacheStatsView
+
 urlpatterns = [
+    path('cache-stats/', CacheStatsView.as_view(), name='cache-stats'),
     path('orders/', include('api.orders.urls')),
     path('products/', include('api.products.urls'))
 ]
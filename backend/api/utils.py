@@ -1,13 +1,87 @@
+import re
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
 from django.utils.text import slugify
-import uuid
 
-def generate_unique_slug(instance, name, model_class, slug_field='slug'):
-    base_slug = slugify(name)
-    slug = base_slug
-    num = 1
+SUFFIX_RE = re.compile(r'^(.+)-(\d+)$')
+
+
+class SlugAllocator:
+    """
+    Allocates unique slugs for one or many names with a single query
+    (one per `lookup_batch_size` distinct names).
+
+    Existing slugs equal to a base slug or shaped like `<base>-<n>` are
+    looked up in one go, and each name gets its base slug if free or
+    `<base>-<n>` with the next unused number. Suffixes are deterministic,
+    so "T-Shirt" always becomes t-shirt, t-shirt-2, t-shirt-3, ...
+
+    Allocation doesn't lock anything: callers insert optimistically and
+    allocate again on IntegrityError (see Product.save and the importer).
+    """
+    suffix_room = 8
+    # Bases matched per query; keeps the OR within database expression
+    # limits (SQLite rejects expression trees deeper than 1000).
+    lookup_batch_size = 200
+
+    def __init__(self, model_class, slug_field='slug'):
+        self.model_class = model_class
+        self.slug_field = slug_field
+        field = model_class._meta.get_field(slug_field)
+        self.max_base_length = (field.max_length or 50) - self.suffix_room
+        self.fallback = model_class._meta.model_name
+
+    def base_slug(self, name):
+        return slugify(name)[:self.max_base_length].strip('-') or self.fallback
+
+    def taken(self, bases, **scope):
+        """Existing slugs within `scope` that equal or extend one of `bases`."""
+        bases = sorted(set(bases))
+        taken = set()
+        for start in range(0, len(bases), self.lookup_batch_size):
+            batch = bases[start:start + self.lookup_batch_size]
+            condition = reduce(or_, (
+                Q(**{f'{self.slug_field}__startswith': f'{base}-'}) for base in batch
+            ), Q(**{f'{self.slug_field}__in': batch}))
+            queryset = self.model_class._default_manager.filter(**scope).filter(condition)
+            taken.update(queryset.values_list(self.slug_field, flat=True))
+        return taken
+
+    def allocate(self, names, taken=None, **scope):
+        """
+        Return one unique slug per name, in order. Pass `taken` to reuse the
+        result of an earlier taken() call instead of querying; it is updated
+        with the slugs handed out.
+        """
+        bases = [self.base_slug(name) for name in names]
+        if taken is None:
+            taken = self.taken(bases, **scope)
+
+        # Highest numeric suffix in use per base.
+        suffixes = {}
+        for slug in taken:
+            self._track_suffix(slug, suffixes)
+
+        slugs = []
+        for base in bases:
+            slug = base
+            if slug in taken:
+                number = suffixes.get(base, 1) + 1
+                slug = f'{base}-{number}'
+            taken.add(slug)
+            self._track_suffix(slug, suffixes)
+            slugs.append(slug)
+        return slugs
 
-    while model_class.objects.filter(**{slug_field: slug}).exists():
-        # You can choose to append a number or short UUID instead of `num`
-        slug = f"{base_slug}-{uuid.uuid4().hex[:6]}"  # shorter random value
+    def allocate_one(self, name, **scope):
+        return self.allocate([name], **scope)[0]
 
-    return slug
+    @staticmethod
+    def _track_suffix(slug, suffixes):
+        match = SUFFIX_RE.match(slug)
+        if match:
+            base, number = match.group(1), int(match.group(2))
+            if number > suffixes.get(base, 1):
+                suffixes[base] = number
@@ -1,3 +1,24 @@
-from django.shortcuts import render
+import os
 
-# Create your views here.
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from subscriptions.cache import subscription_cache
+from .products.caching import response_cache
+
+
+class CacheStatsView(APIView):
+    """
+    Hit and miss counts, with hit ratios, of the API key cache and the
+    catalog response cache. Counters are kept per worker process, so the
+    figures are those of the process that answers (`pid`).
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'pid': os.getpid(),
+            'subscriptions': subscription_cache.get_stats(),
+            'responses': response_cache.get_stats(),
+        })
@@ -27,7 +27,7 @@
 
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
-from subscriptions.models import Subscription
+from subscriptions.cache import subscription_cache
 
 class APIKeyAuthentication(BaseAuthentication):
     def authenticate(self, request):
@@ -36,11 +36,13 @@ class APIKeyAuthentication(BaseAuthentication):
         if not api_key:
             raise AuthenticationFailed('API key missing')
 
-        try:
-            subscription = Subscription.objects.get(api_key=api_key)
-        except Subscription.DoesNotExist:
+        # Served from the per-process / shared cache; only misses hit the DB.
+        subscription = subscription_cache.get(api_key)
+        if subscription is None:
             raise AuthenticationFailed('Invalid API key')
 
+        # Usage is recorded by PlanRateThrottle once the call is admitted,
+        # so calls rejected by the permission or throttle checks are free.
         request.subscription = subscription
         return (None, None)
 
@@ -149,7 +149,63 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
-    )
+    ),
+    # orjson-backed JSON when available (see api/renderers.py, api/parsers.py).
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+}
+
+# Shared by all worker processes: API key lookups, rate limit counters and
+# catalog version tokens must be visible to every worker, so a per-process
+# backend (LocMemCache, the default without this setting) would multiply
+# rate limits by the worker count and serve stale catalog responses.
+# `manage.py check --deploy` rejects process-local backends for these aliases.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': env('REDIS_URL', default='redis://redis:6379/1'),
+    },
+    # Rate limit counters only; clearing them flushes this whole database.
+    'ratelimit': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': env('RATE_LIMIT_REDIS_URL', default='redis://redis:6379/2'),
+    },
+}
+
+# API key -> subscription lookups (see subscriptions/cache.py). Local entries
+# live in each worker process, shared entries in the default cache backend.
+SUBSCRIPTION_CACHE = {
+    'LOCAL_TTL': 30,
+    'LOCAL_MAX_ENTRIES': 1024,
+    'SHARED_TTL': 300,
+    'NEGATIVE_TTL': 60,
+}
+
+# Buffered API usage counting (see subscriptions/metering.py). Usage is
+# written every FLUSH_INTERVAL seconds or after MAX_PENDING calls per worker.
+USAGE_METER = {
+    'FLUSH_INTERVAL': 5,
+    'MAX_PENDING': 100,
+}
+
+# Per-plan request rate limits (see subscriptions/throttling.py).
+RATE_LIMIT = {
+    'STORE': 'subscriptions.throttling.CacheRateLimitStore',
+    'CACHE_ALIAS': 'ratelimit',
+}
+
+# Catalog version tokens for conditional GETs and the versioned response
+# cache for product/category listings (see api/products/caching.py).
+CATALOG_CACHE = {
+    'CACHE_ALIAS': 'default',
+    'RESPONSE_TIMEOUT': 300,
 }
 
 SIMPLE_JWT = {
@@ -0,0 +1,18 @@
+"""
+Settings for the test suite: `python manage.py test --settings=core.test_settings`.
+
+The tests clear caches and rate limit counters, so they run on
+process-local backends and never reach (or flush) a shared Redis.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import RATE_LIMIT
+
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'ratelimit': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ratelimit',
+    },
+}
+
+RATE_LIMIT = {**RATE_LIMIT, 'STORE': 'subscriptions.throttling.LocalRateLimitStore'}
@@ -7,7 +7,7 @@ admin.site.register(Plan)
 class SubscriptionAdmin(admin.ModelAdmin):
     list_display = [
         'id', 'user', 'plan', 'api_key', 'is_active',
-        'usage_count', 'reset_at', 'created_at', 'updated_at'
+        'usage_count', 'quota_exceeded', 'reset_at', 'created_at', 'updated_at'
     ]
     readonly_fields = ['created_at', 'updated_at', 'api_key']  
     search_fields = ['user__username', 'api_key']  
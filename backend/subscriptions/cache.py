@@ -0,0 +1,164 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+DEFAULTS = {
+    'LOCAL_TTL': 30,
+    'LOCAL_MAX_ENTRIES': 1024,
+    'SHARED_TTL': 300,
+    'NEGATIVE_TTL': 60,
+    'KEY_PREFIX': 'subscription:api-key:',
+}
+
+# Stored in place of a subscription when the key is known to be invalid.
+MISSING = '__missing__'
+
+
+class LocalLRUCache:
+    """Small thread-safe LRU with a per-entry TTL, private to this process."""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SubscriptionCache:
+    """
+    Resolves API keys to subscriptions through a per-process LRU backed by
+    Django's cache framework, falling back to the database on a miss.
+
+    Invalid keys are cached as well (negative cache) so repeated bad keys
+    never reach the database. Entries are dropped by `invalidate()` when a
+    subscription's key, plan or active state changes; other processes see
+    the change once their local entry expires (LOCAL_TTL).
+    """
+
+    def __init__(self, options=None):
+        self.options = {**DEFAULTS, **(options or {})}
+        self.local = LocalLRUCache(
+            self.options['LOCAL_MAX_ENTRIES'], self.options['LOCAL_TTL']
+        )
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def _cache_key(self, api_key):
+        # API keys are secrets, so never use them verbatim as cache keys.
+        digest = hashlib.sha256(api_key.encode()).hexdigest()
+        return f"{self.options['KEY_PREFIX']}{digest}"
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def get(self, api_key):
+        """Return the subscription for `api_key`, or None if the key is invalid."""
+        key = self._cache_key(api_key)
+
+        value = self.local.get(key)
+        if value is not None:
+            self._count('local_hits')
+            return self._unwrap(value, hit=True)
+
+        value = cache.get(key)
+        if value is not None:
+            self._count('shared_hits')
+            self.local.set(key, value, self._local_ttl(value))
+            return self._unwrap(value, hit=True)
+
+        self._count('misses')
+        value = self._load(api_key)
+        ttl = self.options['NEGATIVE_TTL'] if value == MISSING else self.options['SHARED_TTL']
+        cache.set(key, value, ttl)
+        self.local.set(key, value, self._local_ttl(value))
+        return self._unwrap(value)
+
+    def _load(self, api_key):
+        from .models import Subscription
+
+        try:
+            return Subscription.objects.select_related('plan').get(api_key=api_key)
+        except Subscription.DoesNotExist:
+            return MISSING
+
+    def _local_ttl(self, value):
+        if value == MISSING:
+            return min(self.options['LOCAL_TTL'], self.options['NEGATIVE_TTL'])
+        return self.options['LOCAL_TTL']
+
+    def _unwrap(self, value, hit=False):
+        if value == MISSING:
+            if hit:
+                self._count('negative_hits')
+            return None
+        # Hand out a copy so per-request changes never leak into the cache.
+        return copy.copy(value)
+
+    def invalidate(self, api_key):
+        if api_key:
+            self.invalidate_many([api_key])
+
+    def invalidate_many(self, api_keys):
+        keys = [self._cache_key(api_key) for api_key in api_keys if api_key]
+        for key in keys:
+            self.local.delete(key)
+        if keys:
+            cache.delete_many(keys)
+
+    def clear_local(self):
+        self.local.clear()
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats = {
+                'local_hits': 0,
+                'shared_hits': 0,
+                'misses': 0,
+                'negative_hits': 0,
+            }
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        hits = stats['local_hits'] + stats['shared_hits']
+        lookups = hits + stats['misses']
+        stats['hits'] = hits
+        stats['hit_ratio'] = hits / lookups if lookups else 0.0
+        return stats
+
+
+subscription_cache = SubscriptionCache(getattr(settings, 'SUBSCRIPTION_CACHE', None))
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_caches(app_configs, **kwargs):
+    """
+    API key lookups, rate limit counters and catalog versions are shared
+    between workers through the cache; a per-process backend silently
+    breaks them once there is more than one worker.
+    """
+    users = {}
+    for setting, alias in (
+        ('SUBSCRIPTION_CACHE', 'default'),
+        ('RATE_LIMIT', getattr(settings, 'RATE_LIMIT', {}).get('CACHE_ALIAS', 'default')),
+        ('CATALOG_CACHE', getattr(settings, 'CATALOG_CACHE', {}).get('CACHE_ALIAS', 'default')),
+    ):
+        users.setdefault(alias, []).append(setting)
+
+    errors = []
+    for alias, setting_names in users.items():
+        backend = settings.CACHES.get(alias, {}).get('BACKEND')
+        if backend in PROCESS_LOCAL_BACKENDS:
+            errors.append(Error(
+                f"Cache alias '{alias}' uses {backend}, which is private to each process.",
+                hint=f"Used by {', '.join(setting_names)}; configure a cache shared by all workers, such as Redis or Memcached.",
+                id='subscriptions.E001',
+            ))
+    return errors
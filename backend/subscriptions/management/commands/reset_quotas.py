@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from subscriptions.cache import subscription_cache
+from subscriptions.models import Plan, Subscription
+
+
+class Command(BaseCommand):
+    help = (
+        "Start a new quota period for every subscription whose period has "
+        "ended, reactivating those that were only disabled for exceeding "
+        "their quota. Run it periodically (e.g. every few minutes from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--plan',
+            help="Only reset subscriptions on the plan with this slug."
+        )
+
+    def handle(self, *args, **options):
+        plans = Plan.objects.all()
+        if options['plan']:
+            plans = plans.filter(slug=options['plan'])
+
+        now = timezone.now()
+        total = 0
+        for plan in plans:
+            expired = Subscription.objects.filter(
+                Q(reset_at__lte=now) | Q(reset_at__isnull=True), plan=plan
+            )
+            with transaction.atomic():
+                api_keys = list(expired.values_list('api_key', flat=True))
+                if not api_keys:
+                    continue
+                count = expired.update(
+                    usage_count=0,
+                    reset_at=now + timezone.timedelta(days=plan.period_days),
+                    is_active=Case(
+                        When(quota_exceeded=True, then=Value(True)),
+                        default=F('is_active'),
+                    ),
+                    quota_exceeded=False,
+                    updated_at=now,
+                )
+            subscription_cache.invalidate_many(api_keys)
+            total += count
+            self.stdout.write(f"{plan.slug}: reset {count} subscription(s)")
+
+        self.stdout.write(self.style.SUCCESS(f"Reset {total} subscription(s)."))
@@ -0,0 +1,156 @@
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from .cache import subscription_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'FLUSH_INTERVAL': 5,
+    'MAX_PENDING': 100,
+}
+
+
+class UsageMeter:
+    """
+    Collects API usage in memory and writes it to `Subscription.usage_count`
+    in batches, with one `F()`-based UPDATE per flush instead of one save()
+    per request.
+
+    Quota checks use a local estimate: the usage read back from the database
+    at the last flush plus the calls recorded since. Each process can admit
+    at most MAX_PENDING calls (or FLUSH_INTERVAL seconds worth of calls)
+    beyond the quota before a flush reconciles and deactivates the
+    subscription.
+    """
+
+    def __init__(self, options=None):
+        self.options = {**DEFAULTS, **(options or {})}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = defaultdict(int)
+        self._pending_total = 0
+        # subscription id -> (usage_count, reset_at) as of the last flush
+        self._known = {}
+        self._last_flush = time.monotonic()
+
+    def record(self, subscription, amount=1):
+        """Record `amount` calls and return the estimated usage for the period."""
+        with self._lock:
+            self._pending[subscription.pk] += amount
+            self._pending_total += amount
+            due = (
+                self._pending_total >= self.options['MAX_PENDING']
+                or time.monotonic() - self._last_flush >= self.options['FLUSH_INTERVAL']
+            )
+
+        if due:
+            self.flush()
+        return self.estimate(subscription)
+
+    def estimate(self, subscription):
+        with self._lock:
+            known = self._known.get(subscription.pk)
+            pending = self._pending.get(subscription.pk, 0)
+        # Prefer whichever of the flushed value and the cached row is newer;
+        # a later reset_at means the period was rolled over since.
+        if known is not None and (
+            subscription.reset_at is None or known[1] is None
+            or known[1] >= subscription.reset_at
+        ):
+            return known[0] + pending
+        return subscription.usage_count + pending
+
+    def is_quota_exceeded(self, subscription):
+        """Whether the quota leaves no room for another call."""
+        return self.estimate(subscription) >= subscription.plan.api_quota
+
+    def flush(self):
+        """
+        Write pending usage to the database; returns the number of rows
+        updated. If the UPDATE fails the counts are kept for the next flush.
+        """
+        from .models import Subscription
+
+        with self._flush_lock:
+            with self._lock:
+                pending = self._pending
+                self._pending = defaultdict(int)
+                self._pending_total = 0
+                self._last_flush = time.monotonic()
+
+            if not pending:
+                return 0
+
+            # Group subscriptions by increment so the CASE stays small.
+            by_amount = defaultdict(list)
+            for pk, amount in pending.items():
+                by_amount[amount].append(pk)
+            increment = Case(
+                *[When(pk__in=pks, then=Value(amount)) for amount, pks in by_amount.items()],
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+
+            now = timezone.now()
+            try:
+                updated = Subscription.objects.filter(pk__in=pending).update(
+                    usage_count=F('usage_count') + increment,
+                    updated_at=now,
+                )
+            except Exception:
+                self._restore(pending)
+                raise
+            self._reconcile(pending, now)
+            return updated
+
+    def _restore(self, pending):
+        with self._lock:
+            for pk, amount in pending.items():
+                self._pending[pk] += amount
+                self._pending_total += amount
+
+    def _reconcile(self, pks, now):
+        from .models import Subscription
+
+        rows = Subscription.objects.filter(pk__in=pks).values_list(
+            'pk', 'api_key', 'usage_count', 'reset_at', 'is_active', 'plan__api_quota'
+        )
+        known = {}
+        exceeded = {}
+        for pk, api_key, usage_count, reset_at, is_active, api_quota in rows:
+            known[pk] = (usage_count, reset_at)
+            if is_active and usage_count >= api_quota:
+                exceeded[pk] = api_key
+
+        if exceeded:
+            Subscription.objects.filter(pk__in=exceeded).update(
+                is_active=False, quota_exceeded=True, updated_at=now
+            )
+            subscription_cache.invalidate_many(exceeded.values())
+
+        with self._lock:
+            self._known.update(known)
+
+
+usage_meter = UsageMeter(getattr(settings, 'USAGE_METER', None))
+
+
+def flush_at_exit():
+    # Don't lose buffered counts when a worker shuts down cleanly. The
+    # database may already be gone by then (e.g. a destroyed test database).
+    try:
+        usage_meter.flush()
+    except DatabaseError:
+        logger.warning('Could not flush buffered API usage at exit.', exc_info=True)
+
+
+atexit.register(flush_at_exit)
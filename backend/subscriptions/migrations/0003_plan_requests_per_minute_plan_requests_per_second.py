@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0002_alter_subscription_options_subscription_created_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plan',
+            name='requests_per_minute',
+            field=models.PositiveIntegerField(blank=True, help_text='Maximum API calls per minute. Leave empty for no limit.', null=True),
+        ),
+        migrations.AddField(
+            model_name='plan',
+            name='requests_per_second',
+            field=models.PositiveIntegerField(blank=True, help_text='Maximum API calls per second. Leave empty for no limit.', null=True),
+        ),
+    ]
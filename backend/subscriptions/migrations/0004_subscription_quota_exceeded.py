@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0003_plan_requests_per_minute_plan_requests_per_second'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subscription',
+            name='quota_exceeded',
+            field=models.BooleanField(default=False, help_text='Set when the subscription was deactivated for exceeding its quota.'),
+        ),
+    ]
@@ -5,6 +5,8 @@ from django.utils import timezone
 import secrets
 import uuid 
 
+from .cache import subscription_cache
+
 User = get_user_model()
 
 class Plan(models.Model):
@@ -31,6 +33,16 @@ class Plan(models.Model):
         default=30,
         help_text="Number of days after which quota resets (default: 30 days)."
     )
+    requests_per_second = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Maximum API calls per second. Leave empty for no limit."
+    )
+    requests_per_minute = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Maximum API calls per minute. Leave empty for no limit."
+    )
 
     class Meta:
         verbose_name = "Subscription Plan"
@@ -67,6 +79,10 @@ class Subscription(models.Model):
         default=0,
         help_text="Number of API calls used in the current period."
     )
+    quota_exceeded = models.BooleanField(
+        default=False,
+        help_text="Set when the subscription was deactivated for exceeding its quota."
+    )
     reset_at = models.DateTimeField(
         null=True,  # Allow null during creation
         blank=True,
@@ -92,11 +108,13 @@ class Subscription(models.Model):
         if not self.api_key:
             self.api_key = self._generate_unique_api_key()
 
-        # Calculate the reset_at date based on the plan's period_days
-        if self.plan and hasattr(self.plan, 'period_days') and self.plan.period_days:
-            self.reset_at = timezone.now() + timezone.timedelta(days=self.plan.period_days)
-        else:
-            raise ValidationError("The plan's period_days is invalid or missing.")
+        # Start the first period; later periods are rolled over in bulk by
+        # the reset_quotas management command.
+        if not self.reset_at:
+            if self.plan and hasattr(self.plan, 'period_days') and self.plan.period_days:
+                self.reset_at = timezone.now() + timezone.timedelta(days=self.plan.period_days)
+            else:
+                raise ValidationError("The plan's period_days is invalid or missing.")
         
         super().save(*args, **kwargs)
 
@@ -111,29 +129,18 @@ class Subscription(models.Model):
 
     def rotate_key(self):
         """Rotate the API key for this subscription."""
+        old_api_key = self.api_key
         self.api_key = self._generate_unique_api_key()
         self.save(update_fields=['api_key', 'updated_at'])
+        subscription_cache.invalidate(old_api_key)
 
     def increment_usage(self):
-        """Increment usage count and handle quota limits."""
-        now = timezone.now()
-        
-        # Check if we need to reset the usage period
-        if self.reset_at and now > self.reset_at:
-            self.usage_count = 0
-            # Fixed the typo: was "now = timezone.timedelta", should be "now + timezone.timedelta"
-            self.reset_at = now + timezone.timedelta(days=self.plan.period_days)
-        
-        # Increment usage
-        self.usage_count += 1
-        
-        # Check quota limit
-        if hasattr(self.plan, 'api_quota') and self.usage_count > self.plan.api_quota:
-            self.is_active = False
-            self.save(update_fields=['usage_count', 'is_active', 'reset_at', 'updated_at'])
+        """Record one API call; the usage meter flushes counts in batches."""
+        from .metering import usage_meter
+
+        usage = usage_meter.record(self)
+        if usage > self.plan.api_quota:
             raise ValidationError('Subscription has reached its quota limit.')
-        
-        self.save(update_fields=['usage_count', 'reset_at', 'updated_at'])
 
     def is_quota_exceeded(self):
         """Check if the subscription has exceeded its quota."""
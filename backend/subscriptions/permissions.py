@@ -1,5 +1,12 @@
 from rest_framework.permissions import BasePermission
 
+from .metering import usage_meter
+
 class HasValidSubscription(BasePermission):
+    message = 'Subscription is inactive or has reached its quota limit.'
+
     def has_permission(self, request, view):
-        return hasattr(request, 'subscription')
+        subscription = getattr(request, 'subscription', None)
+        if subscription is None:
+            return False
+        return subscription.is_active and not usage_meter.is_quota_exceeded(subscription)
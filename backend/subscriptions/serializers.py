@@ -5,7 +5,8 @@ class PlanSerializer(serializers.ModelSerializer):
     class Meta:
         model = Plan
         fields = [
-            'id', 'slug', 'name', 'description', 'api_quota', 'period_days'
+            'id', 'slug', 'name', 'description', 'api_quota', 'period_days',
+            'requests_per_second', 'requests_per_minute'
         ]
 
 class SubscriptionSerializer(serializers.ModelSerializer):
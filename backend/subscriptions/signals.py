@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import subscription_cache
+from .models import Plan, Subscription
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_subscription(sender, instance, **kwargs):
+    # Covers deactivation, plan changes and clears any negative entry for a
+    # freshly issued key. The previous key of a rotation is dropped in
+    # Subscription.rotate_key().
+    subscription_cache.invalidate(instance.api_key)
+
+
+@receiver(post_save, sender=Plan)
+def invalidate_plan_subscriptions(sender, instance, created, **kwargs):
+    if created:
+        return
+    api_keys = instance.subscriptions.values_list('api_key', flat=True)
+    subscription_cache.invalidate_many(list(api_keys))
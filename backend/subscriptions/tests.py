@@ -1,3 +1,311 @@
-from django.test import TestCase
+import io
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.db.models.query import QuerySet
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from authentication.models import UserAccount
+from .cache import subscription_cache
+from .metering import UsageMeter, usage_meter
+from .models import Plan, Subscription
+from .throttling import (
+    CacheRateLimitStore,
+    LocalRateLimitStore,
+    RateLimiter,
+    get_rate_limiter,
+)
+
+
+def create_subscription(email, **plan_fields):
+    plan = Plan.objects.create(slug=email.split('@')[0], name='Test', api_quota=1000, **plan_fields)
+    user = UserAccount.objects.create_user(email=email, password='x', full_name='Shop')
+    return Subscription.objects.create(user=user, plan=plan)
+
+
+class RateLimiterTests(TestCase):
+    def test_delay_weights_the_previous_window_by_its_overlap(self):
+        delay = RateLimiter._delay
+        # Half of the previous window overlaps: 10 * 0.5 + 4 + 1 fits in 10.
+        self.assertIsNone(delay(60, 10, 30, current=4, previous=10))
+        # One more call has to wait until the overlap drops to 4: 6 seconds.
+        self.assertAlmostEqual(delay(60, 10, 30, current=5, previous=10), 6)
+        # No previous traffic: only the current window counts.
+        self.assertIsNone(delay(60, 10, 30, current=9, previous=0))
+
+    def test_delay_when_the_current_window_is_full(self):
+        delay = RateLimiter._delay
+        # Wait for the next window, plus until the full window weighs 9.
+        self.assertAlmostEqual(delay(60, 10, 30, current=10, previous=0), 36)
+        # With a limit of 1 the full window must slide out completely.
+        self.assertAlmostEqual(delay(1, 1, 0.25, current=1, previous=0), 1.75)
+
+    def test_hit_counts_only_allowed_calls(self):
+        limiter = RateLimiter(LocalRateLimitStore(), key_prefix='test:')
+        limits = [(1, 100), (60, 2)]
+
+        self.assertIsNone(limiter.hit('a', limits, now=1000.0))
+        self.assertIsNone(limiter.hit('a', limits, now=1000.5))
+        wait = limiter.hit('a', limits, now=1001.0)
+        self.assertGreater(wait, 0)
+        self.assertEqual(limiter.hit('a', limits, now=1001.0), wait)
+        # Other identities have their own counters.
+        self.assertIsNone(limiter.hit('b', limits, now=1001.0))
+
+    def test_concurrent_calls_cannot_share_the_last_slot(self):
+        class RacingStore(LocalRateLimitStore):
+            # Racing calls all finish reading before any of them is counted.
+            barrier = None
+
+            def get_many(self, keys):
+                result = super().get_many(keys)
+                if self.barrier:
+                    self.barrier.wait()
+                return result
+
+        store = RacingStore()
+        limiter = RateLimiter(store, key_prefix='test:')
+        limits = [(60, 3)]
+        for _ in range(2):
+            self.assertIsNone(limiter.hit('a', limits, now=1000.0))
+
+        store.barrier = threading.Barrier(2, timeout=5)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(limiter.hit('a', limits, now=1000.0)))
+            for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        store.barrier = None
+
+        self.assertEqual(results.count(None), 1)
+        # The rejected call was taken back: only admitted calls are counted.
+        self.assertEqual(store.get_many(['test:a:60:16']), {'test:a:60:16': 3})
+
+    def test_rate_limiter_follows_the_setting(self):
+        with override_settings(RATE_LIMIT={'STORE': 'subscriptions.throttling.CacheRateLimitStore'}):
+            self.assertIsInstance(get_rate_limiter().store, CacheRateLimitStore)
+        self.assertIsInstance(get_rate_limiter().store, LocalRateLimitStore)
+
+    def test_cache_store_clear_keeps_other_cache_entries(self):
+        store = CacheRateLimitStore({'CACHE_ALIAS': 'ratelimit'})
+        cache.set('unrelated', 1)
+        self.assertEqual(store.incr('ratelimit:x', 60), 1)
+
+        store.clear()
+        self.assertEqual(store.get_many(['ratelimit:x']), {})
+        self.assertEqual(cache.get('unrelated'), 1)
+
+
+class PlanRateThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        get_rate_limiter().store.clear()
+
+    def tearDown(self):
+        # Write the calls' usage inside the test transaction so the shared
+        # meter holds nothing for a database that is about to go away.
+        usage_meter.flush()
+
+    def test_calls_over_the_plan_limit_get_429_with_retry_after(self):
+        subscription = create_subscription('throttled@example.com', requests_per_minute=2)
+        client = APIClient(HTTP_X_API_KEY=subscription.api_key)
+
+        for _ in range(2):
+            self.assertEqual(client.get('/api/products/categories/').status_code, 200)
+        response = client.get('/api/products/categories/')
+
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertLessEqual(int(response['Retry-After']), 120)
+
+    def test_plans_without_limits_are_not_throttled(self):
+        subscription = create_subscription('unlimited@example.com')
+        client = APIClient(HTTP_X_API_KEY=subscription.api_key)
+
+        for _ in range(5):
+            self.assertEqual(client.get('/api/products/categories/').status_code, 200)
+
+
+class UsageMeterTests(TestCase):
+    def setUp(self):
+        self.subscription = create_subscription('metered@example.com')
+        self.subscription.plan.api_quota = 5
+        self.subscription.plan.save()
+        self.meter = UsageMeter({'MAX_PENDING': 3, 'FLUSH_INTERVAL': 3600})
+
+    def stored(self):
+        self.subscription.refresh_from_db()
+        return self.subscription.usage_count
+
+    def test_pending_usage_is_flushed_in_one_batch(self):
+        other = create_subscription('metered-other@example.com')
+        self.meter.record(self.subscription)
+        self.meter.record(other)
+        self.assertEqual(self.stored(), 0)
+        self.assertEqual(self.meter.estimate(self.subscription), 1)
+
+        # The third pending call reaches MAX_PENDING and flushes everything.
+        self.meter.record(self.subscription)
+        self.assertEqual(self.stored(), 2)
+        other.refresh_from_db()
+        self.assertEqual(other.usage_count, 1)
+        self.assertEqual(self.meter.estimate(self.subscription), 2)
+
+    def test_failed_flush_keeps_the_pending_usage(self):
+        self.meter.record(self.subscription)
+        self.meter.record(self.subscription)
+        with mock.patch.object(QuerySet, 'update', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.meter.flush()
+        self.assertEqual(self.stored(), 0)
+        self.assertEqual(self.meter.estimate(self.subscription), 2)
+
+        self.meter.flush()
+        self.assertEqual(self.stored(), 2)
+
+    def test_flush_without_pending_usage_writes_nothing(self):
+        self.assertEqual(self.meter.flush(), 0)
+
+    def test_quota_is_exceeded_at_exactly_api_quota(self):
+        for _ in range(4):
+            self.meter.record(self.subscription)
+        self.assertFalse(self.meter.is_quota_exceeded(self.subscription))
+
+        self.meter.record(self.subscription)
+        self.assertTrue(self.meter.is_quota_exceeded(self.subscription))
+
+    def test_flush_deactivates_subscriptions_at_their_quota(self):
+        for _ in range(4):
+            self.meter.record(self.subscription)
+        self.meter.flush()
+        self.subscription.refresh_from_db()
+        self.assertTrue(self.subscription.is_active)
+
+        self.meter.record(self.subscription)
+        self.meter.flush()
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.usage_count, 5)
+        self.assertFalse(self.subscription.is_active)
+        self.assertTrue(self.subscription.quota_exceeded)
+
+
+class SubscriptionCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        subscription_cache.clear_local()
+        subscription_cache.reset_stats()
+        self.subscription = create_subscription('cached@example.com')
+
+    def tearDown(self):
+        usage_meter.flush()
+
+    def test_lookups_go_local_then_shared_then_database(self):
+        key = self.subscription.api_key
+        with self.assertNumQueries(1):
+            self.assertEqual(subscription_cache.get(key), self.subscription)
+        with self.assertNumQueries(0):
+            subscription_cache.get(key)
+            # Another worker: nothing local, but the shared entry is there.
+            subscription_cache.clear_local()
+            subscription_cache.get(key)
+
+        stats = subscription_cache.get_stats()
+        self.assertEqual(
+            {name: stats[name] for name in ('local_hits', 'shared_hits', 'misses', 'hits')},
+            {'local_hits': 1, 'shared_hits': 1, 'misses': 1, 'hits': 2},
+        )
+        self.assertAlmostEqual(stats['hit_ratio'], 2 / 3)
+
+    def test_unknown_keys_are_cached_as_missing(self):
+        with self.assertNumQueries(1):
+            self.assertIsNone(subscription_cache.get('no-such-key'))
+        with self.assertNumQueries(0):
+            self.assertIsNone(subscription_cache.get('no-such-key'))
+        self.assertEqual(subscription_cache.get_stats()['negative_hits'], 1)
+
+        # A subscription taking the key replaces the negative entry.
+        self.subscription.api_key = 'no-such-key'
+        self.subscription.save()
+        self.assertEqual(subscription_cache.get('no-such-key'), self.subscription)
+
+    def test_rotated_key_is_invalidated(self):
+        old_key = self.subscription.api_key
+        subscription_cache.get(old_key)
+
+        self.subscription.rotate_key()
+
+        self.assertIsNone(subscription_cache.get(old_key))
+        self.assertEqual(subscription_cache.get(self.subscription.api_key), self.subscription)
+
+    def test_deactivation_is_seen_on_the_next_lookup(self):
+        client = APIClient(HTTP_X_API_KEY=self.subscription.api_key)
+        self.assertEqual(client.get('/api/products/categories/').status_code, 200)
+
+        self.subscription.is_active = False
+        self.subscription.save()
+
+        self.assertFalse(subscription_cache.get(self.subscription.api_key).is_active)
+        self.assertEqual(client.get('/api/products/categories/').status_code, 403)
+
+
+class ResetQuotasCommandTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        subscription_cache.clear_local()
+        self.now = timezone.now()
+        self.over_quota, self.disabled, self.current = [
+            create_subscription(f'{name}@example.com')
+            for name in ('over-quota', 'disabled', 'current')
+        ]
+        past = self.now - timezone.timedelta(minutes=1)
+        self.set(self.over_quota, usage_count=1000, reset_at=past, is_active=False, quota_exceeded=True)
+        self.set(self.disabled, usage_count=10, reset_at=past, is_active=False)
+        self.set(self.current, usage_count=20, reset_at=self.now + timezone.timedelta(days=1))
+
+    def set(self, subscription, **fields):
+        Subscription.objects.filter(pk=subscription.pk).update(**fields)
+        subscription.refresh_from_db()
+
+    def reset(self, *args):
+        out = io.StringIO()
+        call_command('reset_quotas', *args, stdout=out)
+        return out.getvalue()
+
+    def test_expired_periods_are_reset(self):
+        # Cached while deactivated; the reset has to invalidate it.
+        self.assertFalse(subscription_cache.get(self.over_quota.api_key).is_active)
+
+        self.assertIn('Reset 2 subscription(s).', self.reset())
+
+        self.over_quota.refresh_from_db()
+        self.assertEqual(self.over_quota.usage_count, 0)
+        self.assertTrue(self.over_quota.is_active)
+        self.assertFalse(self.over_quota.quota_exceeded)
+        period = timezone.timedelta(days=self.over_quota.plan.period_days)
+        self.assertGreaterEqual(self.over_quota.reset_at, self.now + period)
+        self.assertTrue(subscription_cache.get(self.over_quota.api_key).is_active)
+
+        # Deactivated for another reason: the period rolls over, but it stays off.
+        self.disabled.refresh_from_db()
+        self.assertEqual(self.disabled.usage_count, 0)
+        self.assertFalse(self.disabled.is_active)
+        self.assertGreater(self.disabled.reset_at, self.now)
+
+        self.current.refresh_from_db()
+        self.assertEqual(self.current.usage_count, 20)
+
+    def test_plan_option_limits_the_reset(self):
+        self.assertIn('Reset 1 subscription(s).', self.reset('--plan', self.disabled.plan.slug))
+
+        self.over_quota.refresh_from_db()
+        self.assertEqual(self.over_quota.usage_count, 1000)
+        self.assertFalse(self.over_quota.is_active)
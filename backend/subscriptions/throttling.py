@@ -0,0 +1,204 @@
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+from .metering import usage_meter
+
+DEFAULTS = {
+    'STORE': 'subscriptions.throttling.CacheRateLimitStore',
+    'CACHE_ALIAS': 'ratelimit',
+    'KEY_PREFIX': 'ratelimit:',
+}
+
+
+class LocalRateLimitStore:
+    """In-process counters; for tests and single-process deployments."""
+
+    def __init__(self, options=None):
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        with self._lock:
+            result = {}
+            for key in keys:
+                entry = self._counters.get(key)
+                if entry and entry[1] > now:
+                    result[key] = entry[0]
+            return result
+
+    def incr(self, key, ttl):
+        now = time.monotonic()
+        with self._lock:
+            count, expires_at = self._counters.get(key, (0, 0))
+            if expires_at <= now:
+                count, expires_at = 0, now + ttl
+            self._counters[key] = (count + 1, expires_at)
+            return count + 1
+
+    def decr(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._counters.get(key)
+            if entry and entry[1] > now:
+                self._counters[key] = (entry[0] - 1, entry[1])
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+
+
+class CacheRateLimitStore:
+    """
+    Counters in a shared Django cache, so limits apply across workers. The
+    cache alias should hold nothing else: clear() empties all of it.
+    """
+
+    def __init__(self, options=None):
+        options = {**DEFAULTS, **(options or {})}
+        self.cache = caches[options['CACHE_ALIAS']]
+
+    def get_many(self, keys):
+        return self.cache.get_many(keys)
+
+    def incr(self, key, ttl):
+        self.cache.add(key, 0, ttl)
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # Expired between add() and incr().
+            self.cache.set(key, 1, ttl)
+            return 1
+
+    def decr(self, key):
+        try:
+            self.cache.decr(key)
+        except ValueError:
+            # Expired since incr(); there's nothing left to take back.
+            pass
+
+    def clear(self):
+        self.cache.clear()
+
+
+class RateLimiter:
+    """
+    Sliding-window counter limiter. Each window keeps a counter for the
+    current and the previous fixed window; the previous one is weighted by
+    how much of it still overlaps the sliding window. Only two small
+    counters per window are stored.
+
+    A call is decided on the value returned by an atomic incr() of the
+    current window, not on a separate read, so concurrent workers can't all
+    see the last free slot. A rejected call is taken back with decr().
+    """
+
+    def __init__(self, store, key_prefix=DEFAULTS['KEY_PREFIX']):
+        self.store = store
+        self.key_prefix = key_prefix
+
+    def hit(self, ident, limits, now=None):
+        """
+        Count one call for `ident` against `limits`, a list of
+        (window_seconds, max_calls). Returns None when the call is allowed,
+        otherwise the number of seconds to wait. Rejected calls are not
+        counted.
+        """
+        now = time.time() if now is None else now
+        windows = []
+        previous_keys = []
+        for window, limit in limits:
+            bucket = int(now // window)
+            current = f'{self.key_prefix}{ident}:{window}:{bucket}'
+            previous = f'{self.key_prefix}{ident}:{window}:{bucket - 1}'
+            windows.append((window, limit, now - bucket * window, current, previous))
+            previous_keys.append(previous)
+
+        previous_counts = self.store.get_many(previous_keys)
+        wait = None
+        for window, limit, elapsed, current, previous in windows:
+            # incr() counts this call too; the estimate is for one more call.
+            count = self.store.incr(current, window * 2)
+            delay = self._delay(window, limit, elapsed, count - 1, previous_counts.get(previous, 0))
+            if delay is not None:
+                wait = delay if wait is None else max(wait, delay)
+
+        if wait is not None:
+            for window, limit, elapsed, current, previous in windows:
+                self.store.decr(current)
+        return wait
+
+    @staticmethod
+    def _delay(window, limit, elapsed, current, previous):
+        weight = 1 - elapsed / window
+        if previous * weight + current + 1 <= limit:
+            return None
+        # Seconds until the estimate leaves room for one more call, assuming
+        # no further traffic in the meantime.
+        if current + 1 <= limit and previous:
+            delay = window * (1 - (limit - 1 - current) / previous) - elapsed
+            if delay < window - elapsed:
+                return max(delay, 0.0)
+        if current + 1 <= limit:
+            return window - elapsed
+        return window - elapsed + window * (1 - (limit - 1) / current)
+
+
+class PlanRateThrottle(BaseThrottle):
+    """
+    Enforces the per-second and per-minute limits of the subscription's plan.
+    Works from the cached subscription, so throttled calls never touch the
+    Subscription row. Must run after APIKeyAuthentication.
+
+    Throttles are the last check DRF runs before the handler, so this is
+    also where admitted calls are recorded with the usage meter; calls
+    rejected with 401/403/429 don't count against the quota.
+    """
+
+    def allow_request(self, request, view):
+        subscription = getattr(request, 'subscription', None)
+        if subscription is None:
+            return True
+
+        plan = subscription.plan
+        limits = [
+            (window, limit)
+            for window, limit in ((1, plan.requests_per_second), (60, plan.requests_per_minute))
+            if limit
+        ]
+        self._wait = get_rate_limiter().hit(subscription.pk, limits) if limits else None
+        if self._wait is not None:
+            return False
+        usage_meter.record(subscription)
+        return True
+
+    def wait(self):
+        return math.ceil(self._wait) if self._wait else None
+
+
+_rate_limiter = None
+
+
+def get_rate_limiter():
+    """The RateLimiter configured by the RATE_LIMIT setting, built on first use."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        options = {**DEFAULTS, **getattr(settings, 'RATE_LIMIT', {})}
+        store = import_string(options['STORE'])(options)
+        _rate_limiter = RateLimiter(store, options['KEY_PREFIX'])
+    return _rate_limiter
+
+
+@receiver(setting_changed)
+def _reset_rate_limiter(setting, **kwargs):
+    global _rate_limiter
+    if setting in ('RATE_LIMIT', 'CACHES'):
+        _rate_limiter = None